@@ -0,0 +1,64 @@
+"""
+Measure cold import time of py-rate-guard entry points.
+
+Each scenario runs in a fresh interpreter so module caches do not leak between runs.
+
+    python benchmarks/import_time.py [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SCENARIOS: Dict[str, str] = {
+    "package": "import py_rate_guard",
+    "memory_storage": "from py_rate_guard.storage.memory import MemoryStorage",
+    "config": "from py_rate_guard import RateGuardConfig, RateLimitRule",
+    "engine": "from py_rate_guard import RateLimiter",
+    "redis_storage": "from py_rate_guard.storage.redis import RedisStorage",
+}
+
+# Modules that must not be loaded by a bare ``import py_rate_guard``.
+HEAVY_MODULES = ["redis", "prometheus_client", "pydantic", "fastapi", "starlette", "django"]
+
+
+def time_import(statement: str, runs: int) -> List[float]:
+    samples = []
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip()))
+    return samples
+
+
+def loaded_heavy_modules(statement: str) -> List[str]:
+    code = (
+        f"import sys; {statement}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return [m for m in out.stdout.strip().split(",") if m]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16} {'median ms':>10} {'min ms':>10}  heavy modules loaded")
+    for name, statement in SCENARIOS.items():
+        try:
+            samples = time_import(statement, args.runs)
+            heavy = loaded_heavy_modules(statement)
+        except subprocess.CalledProcessError:
+            print(f"{name:<16} {'skipped (missing optional dependency)':>10}")
+            continue
+        print(
+            f"{name:<16} {statistics.median(samples) * 1000:>10.2f} "
+            f"{min(samples) * 1000:>10.2f}  {', '.join(heavy) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
-from py_rate_guard.core.engine import RateLimiter
-from py_rate_guard.models.config import RateGuardConfig, RateLimitRule, RedisConfig
-from py_rate_guard.exceptions import RateLimitExceeded, RateLimitError
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from py_rate_guard.core.engine import RateLimiter
+    from py_rate_guard.exceptions import RateLimitError, RateLimitExceeded
+    from py_rate_guard.models.config import RateGuardConfig, RateLimitRule, RedisConfig
 
 __version__ = "0.1.0"
 __all__ = [
@@ -11,3 +15,27 @@ __all__ = [
     "RateLimitExceeded",
     "RateLimitError",
 ]
+
+# Public names are resolved on first access so that ``import py_rate_guard`` does not
+# pull in pydantic, redis or prometheus_client until they are actually needed.
+_LAZY_ATTRS = {
+    "RateLimiter": "py_rate_guard.core.engine",
+    "RateGuardConfig": "py_rate_guard.models.config",
+    "RateLimitRule": "py_rate_guard.models.config",
+    "RedisConfig": "py_rate_guard.models.config",
+    "RateLimitExceeded": "py_rate_guard.exceptions",
+    "RateLimitError": "py_rate_guard.exceptions",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
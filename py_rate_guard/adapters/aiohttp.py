@@ -0,0 +1,37 @@
+from typing import Any, Callable
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError as e:
+    raise ImportError(
+        "aiohttp support requires the 'aiohttp' extra: pip install 'py-rate-guard[aiohttp]'"
+    ) from e
+
+from py_rate_guard.core.outbound import OutboundLimiter
+
+def host_key(url: URL) -> str:
+    return url.host or ""
+
+def rate_limit_trace_config(
+    outbound: OutboundLimiter,
+    key_func: Callable[[URL], str] = host_key
+) -> aiohttp.TraceConfig:
+    """
+    Build a TraceConfig that waits for an outbound slot before each request and reports
+    vendor rate limit headers back to the shared budget.
+
+        session = aiohttp.ClientSession(trace_configs=[rate_limit_trace_config(outbound)])
+    """
+    async def on_request_start(session: Any, context: Any, params: Any) -> None:
+        context.rate_guard_key = key_func(params.url)
+        await outbound.acquire(context.rate_guard_key)
+
+    async def on_request_end(session: Any, context: Any, params: Any) -> None:
+        response = params.response
+        await outbound.update(context.rate_guard_key, response.status, response.headers)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
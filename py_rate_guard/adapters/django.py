@@ -1,13 +1,26 @@
 import asyncio
 from typing import Any, Callable, Optional
-from django.http import JsonResponse, HttpResponse
-from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    from django.http import JsonResponse, HttpResponse
+    from django.core.exceptions import MiddlewareNotUsed
+    from django.utils.module_loading import import_string
+    import asgiref.sync
+except ImportError as e:
+    raise ImportError(
+        "Django support requires the 'django' extra: pip install 'py-rate-guard[django]'"
+    ) from e
+
 from py_rate_guard.core.engine import RateLimiter
 from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
 from py_rate_guard.resolvers.default import IPResolver
-import asgiref.sync
+from py_rate_guard.resolvers.priority import BasePriorityResolver
 
 class DjangoRateGuardMiddleware:
+    # Gives requests a priority class for reserved capacity. Set it in a subclass or via
+    # settings.RATE_GUARD_PRIORITY_RESOLVER (a resolver, or the dotted path of a class).
+    priority_resolver: Optional[BasePriorityResolver] = None
+
     def __init__(self, get_response: Callable):
         self.get_response = get_response
         # Typically loaded from settings.py
@@ -20,6 +33,11 @@ class DjangoRateGuardMiddleware:
             
         self.limiter = RateLimiter(self.config)
         self.resolver = IPResolver()
+        priority_resolver = getattr(settings, "RATE_GUARD_PRIORITY_RESOLVER", None)
+        if isinstance(priority_resolver, str):
+            priority_resolver = import_string(priority_resolver)()
+        if priority_resolver is not None:
+            self.priority_resolver = priority_resolver
 
     def __call__(self, request):
         if asyncio.iscoroutinefunction(self.get_response):
@@ -29,27 +47,37 @@ class DjangoRateGuardMiddleware:
     def _sync_call(self, request):
         if self.config.global_rules:
             # Resolve key
-            key = asgiref.sync.async_to_sync(self.resolver.resolve)(request)
+            with self.limiter.instrumentation.stage("resolve"):
+                key = asgiref.sync.async_to_sync(self.resolver.resolve)(request)
+                priority = None
+                if self.priority_resolver:
+                    priority = asgiref.sync.async_to_sync(self.priority_resolver.resolve)(request)
             
             allowed, rule, retry_after = asgiref.sync.async_to_sync(self.limiter.check)(
-                key, self.config.global_rules
+                key, self.config.global_rules, priority
             )
             
             if not allowed:
-                return self._rate_limit_response(retry_after)
+                with self.limiter.instrumentation.stage("response_build"):
+                    return self._rate_limit_response(retry_after)
 
         response = self.get_response(request)
         return response
 
     async def _async_call(self, request):
         if self.config.global_rules:
-            key = await self.resolver.resolve(request)
+            with self.limiter.instrumentation.stage("resolve"):
+                key = await self.resolver.resolve(request)
+                priority = None
+                if self.priority_resolver:
+                    priority = await self.priority_resolver.resolve(request)
             allowed, rule, retry_after = await self.limiter.check(
-                key, self.config.global_rules
+                key, self.config.global_rules, priority
             )
             
             if not allowed:
-                return self._rate_limit_response(retry_after)
+                with self.limiter.instrumentation.stage("response_build"):
+                    return self._rate_limit_response(retry_after)
 
         response = await self.get_response(request)
         return response
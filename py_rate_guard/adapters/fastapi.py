@@ -1,16 +1,31 @@
-from typing import Callable, List, Optional, Union
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+import math
+from typing import Any, Callable, List, Optional, Union
 from functools import wraps
 
+try:
+    from fastapi import Request, Response, HTTPException, WebSocket, status
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.websockets import WebSocketState
+except ImportError as e:
+    raise ImportError(
+        "FastAPI support requires the 'fastapi' extra: pip install 'py-rate-guard[fastapi]'"
+    ) from e
+
 from py_rate_guard.core.engine import RateLimiter
-from py_rate_guard.models.config import RateLimitRule, RateGuardConfig
+from py_rate_guard.core.lease import LeasePool
+from py_rate_guard.models.config import HierarchicalQuota, RateLimitRule, RateGuardConfig
 from py_rate_guard.resolvers.default import BaseResolver, IPResolver
+from py_rate_guard.resolvers.priority import BasePriorityResolver
 
 class FastAPIRateGuard:
-    def __init__(self, config: RateGuardConfig):
+    def __init__(
+        self,
+        config: RateGuardConfig,
+        priority_resolver: Optional[BasePriorityResolver] = None
+    ):
         self.limiter = RateLimiter(config)
         self.config = config
+        self.priority_resolver = priority_resolver
 
     def middleware(self) -> Callable:
         async def dispatch(request: Request, call_next: Callable) -> Response:
@@ -21,11 +36,16 @@ class FastAPIRateGuard:
             if self.config.global_rules:
                 # Use IP as default global key
                 resolver = IPResolver()
-                key = await resolver.resolve(request)
+                with self.limiter.instrumentation.stage("resolve"):
+                    key = await resolver.resolve(request)
+                    priority = await self._resolve_priority(self.priority_resolver, request)
                 
-                allowed, rule, retry_after = await self.limiter.check(key, self.config.global_rules)
+                allowed, rule, retry_after = await self.limiter.check(
+                    key, self.config.global_rules, priority
+                )
                 if not allowed:
-                    return self._rate_limit_response(retry_after)
+                    with self.limiter.instrumentation.stage("response_build"):
+                        return self._rate_limit_response(retry_after)
 
             response = await call_next(request)
             return response
@@ -36,40 +56,152 @@ class FastAPIRateGuard:
         self, 
         limit: str, 
         strategy: str = "sliding_window", 
-        key_resolver: Optional[BaseResolver] = None
+        key_resolver: Optional[BaseResolver] = None,
+        priority_resolver: Optional[BasePriorityResolver] = None,
+        reserved: Optional[dict] = None,
+        mode: str = "reject",
+        max_wait: float = 0.0
     ):
         def decorator(func: Callable):
-            rule = RateLimitRule(limit=limit, strategy=strategy)
+            rule = RateLimitRule(
+                limit=limit,
+                strategy=strategy,
+                reserved=reserved or {},
+                mode=mode,
+                max_wait=max_wait
+            )
             resolver = key_resolver or IPResolver()
+            route_priority_resolver = priority_resolver or self.priority_resolver
 
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                # Search for request in kwargs or args
-                request: Optional[Request] = None
-                for arg in args:
-                    if isinstance(arg, Request):
-                        request = arg
-                        break
-                if not request:
-                    for k, v in kwargs.items():
-                        if isinstance(v, Request):
-                            request = v
-                            break
+                request = self._find_request(args, kwargs)
                 
                 if request:
-                    key = await resolver.resolve(request)
-                    allowed, vi_rule, retry_after = await self.limiter.check(key, [rule])
+                    with self.limiter.instrumentation.stage("resolve"):
+                        key = await resolver.resolve(request)
+                        priority = await self._resolve_priority(route_priority_resolver, request)
+                    allowed, vi_rule, retry_after = await self.limiter.check(key, [rule], priority)
                     if not allowed:
-                        raise HTTPException(
-                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                            detail="Rate limit exceeded",
-                            headers={"Retry-After": str(retry_after)}
-                        )
+                        with self.limiter.instrumentation.stage("response_build"):
+                            exc = HTTPException(
+                                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Rate limit exceeded",
+                                headers={"Retry-After": str(retry_after)}
+                            )
+                        raise exc
                 
                 return await func(*args, **kwargs)
             return wrapper
         return decorator
 
+    def quota(self, quota: HierarchicalQuota, key_resolvers: List[BaseResolver]):
+        """
+        Enforce a hierarchical quota (e.g. org -> user -> API key) on a route.
+        ``key_resolvers`` resolve one key per level, ordered like ``quota.levels``.
+        """
+        def decorator(func: Callable):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = self._find_request(args, kwargs)
+
+                if request:
+                    with self.limiter.instrumentation.stage("resolve"):
+                        keys = [await resolver.resolve(request) for resolver in key_resolvers]
+                    allowed, level, retry_after = await self.limiter.check_hierarchy(keys, quota)
+                    if not allowed:
+                        with self.limiter.instrumentation.stage("response_build"):
+                            exc = HTTPException(
+                                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail=f"Rate limit exceeded for {level.name}",
+                                headers={"Retry-After": str(retry_after)}
+                            )
+                        raise exc
+
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def websocket_limit(
+        self,
+        connect_limit: Optional[str] = None,
+        message_limit: Optional[str] = None,
+        strategy: str = "sliding_window",
+        key_resolver: Optional[BaseResolver] = None,
+        frame_bytes: Optional[int] = None,
+        lease_size: int = 10,
+        lease_ttl: Optional[float] = None
+    ):
+        """
+        Limit a WebSocket route: ``connect_limit`` applies to handshakes, ``message_limit``
+        to incoming messages. With ``frame_bytes`` a message costs one unit per started
+        ``frame_bytes`` of payload. Messages are admitted from a TokenLease shared by all
+        of a key's connections in this process, so storage is called about once per
+        ``lease_size`` units; ``lease_ttl`` defaults to the message rule's window.
+        Rejected handshakes and connections over the message limit are closed with 1008.
+        """
+        def decorator(func: Callable):
+            connect_rule = message_rule = None
+            if connect_limit:
+                connect_rule = RateLimitRule(limit=connect_limit, strategy=strategy, key_prefix="rlws")
+            if message_limit:
+                message_rule = RateLimitRule(limit=message_limit, strategy=strategy, key_prefix="rlwm")
+            resolver = key_resolver or IPResolver()
+            leases = None
+            if message_rule is not None:
+                leases = LeasePool(self.limiter, message_rule, lease_size, lease_ttl)
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                websocket = self._find_websocket(args, kwargs)
+                if websocket is None or not self.config.enabled:
+                    return await func(*args, **kwargs)
+
+                with self.limiter.instrumentation.stage("resolve"):
+                    key = await resolver.resolve(websocket)
+                if connect_rule is not None:
+                    allowed, _, retry_after = await self.limiter.check(key, [connect_rule])
+                    if not allowed:
+                        await websocket.close(
+                            code=status.WS_1008_POLICY_VIOLATION,
+                            reason=f"Rate limit exceeded. Retry after {retry_after}s."
+                        )
+                        return None
+
+                if leases is not None:
+                    limited = RateLimitedWebSocket(websocket, leases, key, frame_bytes)
+                    args = tuple(limited if arg is websocket else arg for arg in args)
+                    kwargs = {k: limited if v is websocket else v for k, v in kwargs.items()}
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    async def _resolve_priority(
+        resolver: Optional[BasePriorityResolver], request: Request
+    ) -> Optional[int]:
+        if resolver is None:
+            return None
+        return await resolver.resolve(request)
+
+    @staticmethod
+    def _find_request(args: tuple, kwargs: dict) -> Optional[Request]:
+        # Search for request in kwargs or args
+        for arg in args:
+            if isinstance(arg, Request):
+                return arg
+        for v in kwargs.values():
+            if isinstance(v, Request):
+                return v
+        return None
+
+    @staticmethod
+    def _find_websocket(args: tuple, kwargs: dict) -> Optional[WebSocket]:
+        for arg in list(args) + list(kwargs.values()):
+            if isinstance(arg, WebSocket):
+                return arg
+        return None
+
     def _rate_limit_response(self, retry_after: int) -> Response:
         return Response(
             content="Rate limit exceeded",
@@ -77,6 +209,48 @@ class FastAPIRateGuard:
             headers={"Retry-After": str(retry_after)}
         )
 
+class RateLimitedWebSocket(WebSocket):
+    """
+    Wraps an endpoint's WebSocket so that every incoming message is charged to the
+    key's lease in ``leases``. Over the limit, the connection is closed with 1008 and
+    the endpoint receives a disconnect (WebSocketDisconnect from the receive_* helpers).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        leases: LeasePool,
+        key: str,
+        frame_bytes: Optional[int] = None
+    ):
+        super().__init__(websocket.scope, receive=websocket.receive, send=websocket.send)
+        self.leases = leases
+        self.key = key
+        self.frame_bytes = frame_bytes
+
+    def message_cost(self, message: Any) -> int:
+        if not self.frame_bytes:
+            return 1
+        payload = message.get("bytes")
+        if payload is None:
+            payload = (message.get("text") or "").encode()
+        return max(1, math.ceil(len(payload) / self.frame_bytes))
+
+    async def receive(self) -> Any:
+        message = await super().receive()
+        if message["type"] != "websocket.receive":
+            return message
+        lease = self.leases.get(self.key)
+        allowed, retry_after = await lease.acquire(self.message_cost(message))
+        if allowed:
+            return message
+        await self.close(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason=f"Message rate limit exceeded. Retry after {retry_after}s."
+        )
+        self.client_state = WebSocketState.DISCONNECTED
+        return {"type": "websocket.disconnect", "code": status.WS_1008_POLICY_VIOLATION}
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, guard: FastAPIRateGuard):
         super().__init__(app)
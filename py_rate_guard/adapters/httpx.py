@@ -0,0 +1,41 @@
+from typing import Callable, Optional
+
+try:
+    import httpx
+except ImportError as e:
+    raise ImportError(
+        "httpx support requires the 'httpx' extra: pip install 'py-rate-guard[httpx]'"
+    ) from e
+
+from py_rate_guard.core.outbound import OutboundLimiter
+
+def host_key(request: httpx.Request) -> str:
+    return request.url.host
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that waits for an outbound slot before each request and reports
+    vendor rate limit headers back to the shared budget.
+
+        client = httpx.AsyncClient(transport=RateLimitedTransport(outbound))
+    """
+
+    def __init__(
+        self,
+        outbound: OutboundLimiter,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        key_func: Callable[[httpx.Request], str] = host_key
+    ):
+        self.outbound = outbound
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.key_func = key_func
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self.key_func(request)
+        await self.outbound.acquire(key)
+        response = await self.transport.handle_async_request(request)
+        await self.outbound.update(key, response.status_code, response.headers)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,332 @@
+"""
+Keyspace inspection and bulk reset for the rate limiter's Redis data.
+
+Keys are streamed with SCAN (never KEYS) and inspected in pipelined batches of
+MEMORY USAGE, TTL and TYPE, so Redis is not blocked on large keyspaces. In cluster
+mode every primary node is scanned separately.
+
+    python -m py_rate_guard.admin.keyspace stats --match 'rl:*' --top 20
+    python -m py_rate_guard.admin.keyspace reset --pattern 'rl:tenant-42:*' --dry-run
+    python -m py_rate_guard.admin.keyspace reset --pattern 'rl:tenant-42:*' --yes
+
+Stats are aggregated per key prefix and per rule, based on the key layouts used by
+``RateLimiter``: ``{key_prefix}:{key}:{limit}`` for rules and
+``{key_prefix}:{{root}}:{level}:...`` for hierarchical quotas.
+
+Resets only touch keys under the rate limiter's prefixes, so a shared Redis keeps its
+other data even for a pattern like ``*``.
+"""
+import argparse
+import asyncio
+import json
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from py_rate_guard.utils.imports import require
+
+redis = require("redis.asyncio", "redis")
+
+from py_rate_guard.models.config import RedisConfig
+from py_rate_guard.storage.redis import RedisStorage
+
+LIMIT_PATTERN = re.compile(r"^\d+/\w+$")
+# Default key prefixes of rules, hierarchical quotas, outbound blocks and WebSocket limits
+KEY_PREFIXES = ("rl", "rlq", "rlb", "rlws", "rlwm")
+
+class KeyInfo(NamedTuple):
+    key: str
+    type: str
+    ttl: int  # -1: no expiry, -2: deleted while scanning
+    memory: Optional[int]  # None when MEMORY USAGE is unavailable
+
+def classify_key(key: str) -> Tuple[str, str]:
+    """Return ``(prefix, rule)`` for a rate limiter key; rule is "" when unknown."""
+    parts = key.split(":")
+    if len(parts) < 2:
+        return "", ""
+    if LIMIT_PATTERN.match(parts[-1]):
+        return parts[0], parts[-1]
+    if parts[1].startswith("{") and len(parts) > 2:
+        # Hierarchical quota: the level name follows the hash-tagged root key
+        return parts[0], parts[2]
+    return parts[0], ""
+
+def under_prefix(pattern: str, prefixes: Iterable[str]) -> bool:
+    """True when every key matching ``pattern`` starts with one of ``prefixes`` and ":"."""
+    head, sep, _ = pattern.partition(":")
+    return bool(sep) and head in prefixes
+
+class GroupStats:
+    """Totals for one group of keys."""
+
+    def __init__(self):
+        self.keys = 0
+        self.memory_bytes = 0
+        self.memory_unknown = 0
+        self.no_ttl = 0  # Keys that will never expire, usually a leak
+        self.types: Dict[str, int] = {}
+
+    def add(self, info: KeyInfo) -> None:
+        self.keys += 1
+        if info.memory is None:
+            self.memory_unknown += 1
+        else:
+            self.memory_bytes += info.memory
+        if info.ttl == -1:
+            self.no_ttl += 1
+        self.types[info.type] = self.types.get(info.type, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+class KeyspaceReport:
+    """Keyspace totals per prefix and per (prefix, rule), plus the largest keys."""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.total = GroupStats()
+        self.prefixes: Dict[str, GroupStats] = {}
+        self.rules: Dict[Tuple[str, str], GroupStats] = {}
+        self.largest: List[KeyInfo] = []
+
+    def add(self, info: KeyInfo) -> None:
+        prefix, rule = classify_key(info.key)
+        self.total.add(info)
+        self.prefixes.setdefault(prefix, GroupStats()).add(info)
+        self.rules.setdefault((prefix, rule), GroupStats()).add(info)
+        if self.top and info.memory is not None:
+            self.largest.append(info)
+            if len(self.largest) > self.top * 4:
+                self._trim()
+
+    def _trim(self) -> None:
+        self.largest.sort(key=lambda info: info.memory, reverse=True)
+        del self.largest[self.top:]
+
+    def as_dict(self) -> Dict[str, Any]:
+        self._trim()
+        return {
+            "total": self.total.as_dict(),
+            "prefixes": {prefix: stats.as_dict() for prefix, stats in self.prefixes.items()},
+            "rules": [
+                {"prefix": prefix, "rule": rule, **stats.as_dict()}
+                for (prefix, rule), stats in self.rules.items()
+            ],
+            "largest": [info._asdict() for info in self.largest],
+        }
+
+class KeyspaceAdmin:
+    """
+    Streams, aggregates and resets rate limiter keys on every Redis node.
+    ``prefixes`` lists the key prefixes reset() may delete under; add custom
+    ``RateLimitRule.key_prefix`` values to it.
+    """
+
+    def __init__(
+        self,
+        config: Optional[RedisConfig] = None,
+        client: Optional[Any] = None,
+        prefixes: Iterable[str] = KEY_PREFIXES
+    ):
+        self.config = config or RedisConfig()
+        self.client = client
+        self.prefixes = frozenset(prefixes)
+        self._storage: Optional[RedisStorage] = None
+        self._node_clients: List[Any] = []
+
+    async def nodes(self) -> List[Any]:
+        """Clients for every node to scan: each primary in cluster mode, else the one client."""
+        if self.client is None:
+            # Reuse the storage's connection logic for standalone, Sentinel and cluster setups
+            self._storage = RedisStorage(self.config)
+            await self._storage.connect()
+            self.client = self._storage.client
+        if not self.config.cluster:
+            return [self.client]
+        if not self._node_clients:
+            await self.client.initialize()
+            self._node_clients = [
+                redis.Redis(
+                    host=node.host,
+                    port=node.port,
+                    password=self.config.password,
+                    ssl=self.config.ssl,
+                    decode_responses=True
+                )
+                for node in self.client.get_primaries()
+            ]
+        return self._node_clients
+
+    async def scan(self, match: str = "*", count: int = 1000) -> AsyncIterator[KeyInfo]:
+        """Yield a KeyInfo per key matching ``match``, one pipelined batch per SCAN page."""
+        for node in await self.nodes():
+            async for keys in self._scan_node(node, match, count):
+                pipe = node.pipeline(transaction=False)
+                for key in keys:
+                    pipe.type(key)
+                    pipe.ttl(key)
+                    pipe.memory_usage(key)
+                results = await pipe.execute(raise_on_error=False)
+                for i, key in enumerate(keys):
+                    key_type, ttl, memory = results[3 * i:3 * i + 3]
+                    if isinstance(key_type, Exception) or key_type == "none":
+                        continue  # Expired or deleted since SCAN returned it
+                    yield KeyInfo(
+                        key,
+                        key_type,
+                        ttl if isinstance(ttl, int) else -1,
+                        memory if isinstance(memory, int) else None
+                    )
+
+    async def stats(self, match: str = "*", count: int = 1000, top: int = 10) -> KeyspaceReport:
+        report = KeyspaceReport(top)
+        async for info in self.scan(match, count):
+            report.add(info)
+        return report
+
+    async def reset(
+        self,
+        pattern: Optional[str] = None,
+        keys: Optional[Iterable[str]] = None,
+        batch: int = 500,
+        count: int = 1000,
+        dry_run: bool = False
+    ) -> int:
+        """
+        Delete the keys matching ``pattern`` and/or the given ``keys`` with pipelined UNLINK.
+        Both must be under one of ``prefixes``, else ValueError is raised. With
+        ``dry_run`` matching keys are only counted.
+        Returns: number of keys deleted (or that would be deleted)
+        """
+        if pattern is None and keys is None:
+            raise ValueError("reset() needs a pattern or a list of keys")
+        keys = None if keys is None else list(keys)
+        names = ([] if pattern is None else [pattern]) + (keys or [])
+        for name in names:
+            if not under_prefix(name, self.prefixes):
+                raise ValueError(
+                    f"Refusing to reset {name!r}: not under a rate limiter prefix "
+                    f"({', '.join(sorted(self.prefixes))})"
+                )
+        deleted = 0
+        if pattern is not None:
+            for node in await self.nodes():
+                async for page in self._scan_node(node, pattern, count):
+                    deleted += len(page) if dry_run else await self._unlink(node, page)
+        if keys is not None:
+            await self.nodes()
+            # One command per key: a cluster pipeline routes each to the node owning its slot
+            for start in range(0, len(keys), batch):
+                chunk = keys[start:start + batch]
+                if dry_run:
+                    deleted += await self._exists(self.client, chunk)
+                else:
+                    deleted += await self._unlink(self.client, chunk)
+        return deleted
+
+    @staticmethod
+    async def _scan_node(node: Any, match: str, count: int) -> AsyncIterator[List[str]]:
+        cursor = 0
+        while True:
+            cursor, keys = await node.scan(cursor, match=match, count=count)
+            if keys:
+                yield keys
+            if not cursor:
+                break
+
+    @staticmethod
+    async def _unlink(client: Any, keys: List[str]) -> int:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.unlink(key)
+        return sum(await pipe.execute())
+
+    @staticmethod
+    async def _exists(client: Any, keys: List[str]) -> int:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.exists(key)
+        return sum(await pipe.execute())
+
+    async def close(self) -> None:
+        for node in self._node_clients:
+            await node.close()
+        self._node_clients = []
+        if self._storage is not None:
+            await self._storage.close()
+            self._storage = None
+            self.client = None
+
+def format_report(report: KeyspaceReport) -> str:
+    data = report.as_dict()
+    columns = [("prefix", 12), ("rule", 16), ("keys", 10), ("memory_bytes", 14), ("no_ttl", 8), ("types", 0)]
+    lines = [" ".join(f"{name:>{width}}" for name, width in columns)]
+    for row in sorted(data["rules"], key=lambda row: row["memory_bytes"], reverse=True):
+        row = dict(row, types=",".join(f"{t}={n}" for t, n in sorted(row["types"].items())))
+        lines.append(" ".join(f"{row[name]:>{width}}" for name, width in columns))
+    total = data["total"]
+    lines.append(
+        f"total: {total['keys']} keys, {total['memory_bytes']} bytes"
+        + (f" ({total['memory_unknown']} keys without MEMORY USAGE)" if total["memory_unknown"] else "")
+    )
+    if data["largest"]:
+        lines.append("largest keys:")
+        for info in data["largest"]:
+            lines.append(f"  {info['memory']:>10} {info['type']:>6} ttl={info['ttl']} {info['key']}")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or reset rate limiter keys in Redis.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=0)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--ssl", action="store_true")
+    parser.add_argument("--cluster", action="store_true", help="Scan every primary of a Redis Cluster")
+    parser.add_argument("--count", type=int, default=1000, help="SCAN COUNT hint per page")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="Key counts and memory per prefix and rule")
+    stats.add_argument("--match", default="*", help="SCAN MATCH pattern")
+    stats.add_argument("--top", type=int, default=10, help="Number of largest keys to list")
+    stats.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    reset = commands.add_parser("reset", help="Delete keys by pattern or name with UNLINK")
+    reset.add_argument("--pattern", help="SCAN MATCH pattern of keys to delete")
+    reset.add_argument("--key", action="append", dest="keys", help="Key to delete (repeatable)")
+    reset.add_argument(
+        "--prefix", action="append", dest="prefixes", default=[],
+        help=f"Extra key prefix that may be reset (repeatable; always: {', '.join(KEY_PREFIXES)})"
+    )
+    confirm = reset.add_mutually_exclusive_group(required=True)
+    confirm.add_argument("--dry-run", action="store_true", help="Only count the keys that would be deleted")
+    confirm.add_argument("--yes", action="store_true", help="Confirm the deletion")
+    args = parser.parse_args(argv)
+    prefixes = KEY_PREFIXES + tuple(getattr(args, "prefixes", []))
+    if args.command == "reset":
+        if not (args.pattern or args.keys):
+            parser.error("reset needs --pattern or --key")
+        for name in [args.pattern] if args.pattern else args.keys:
+            if not under_prefix(name, prefixes):
+                parser.error(f"{name!r} is not under a rate limiter prefix; see --prefix")
+
+    config = RedisConfig(
+        host=args.host, port=args.port, db=args.db, password=args.password,
+        ssl=args.ssl, cluster=args.cluster
+    )
+
+    async def run() -> None:
+        admin = KeyspaceAdmin(config, prefixes=prefixes)
+        try:
+            if args.command == "stats":
+                report = await admin.stats(args.match, args.count, args.top)
+                print(json.dumps(report.as_dict(), indent=2) if args.json else format_report(report))
+            else:
+                deleted = await admin.reset(args.pattern, args.keys, count=args.count, dry_run=args.dry_run)
+                print(f"Would delete {deleted} keys" if args.dry_run else f"Deleted {deleted} keys")
+        finally:
+            await admin.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
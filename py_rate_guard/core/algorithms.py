@@ -0,0 +1,288 @@
+"""
+Pure-Python implementations of the rate limiting strategies.
+
+Each function mirrors the Lua script of the same strategy in ``py_rate_guard.utils.lua``
+step by step, including the integer time units and key expiry, so that in-process
+backends and the simulator make the same decisions as Redis.
+
+``state`` is a mutable dict holding one key's data. It must be empty for a new key;
+use ``is_expired`` to detect keys Redis would have evicted through their TTL.
+Every function returns ``(is_allowed, remaining_requests, retry_after)``. ``reserve`` is
+the fraction of the limit (or capacity) held back for higher priority classes.
+"""
+import math
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Result = Tuple[bool, int, int]
+
+def is_expired(state: Dict[str, Any], now: float) -> bool:
+    expires_at = state.get("expires_at")
+    return expires_at is not None and now > expires_at
+
+def bucket_layout(window: int, precision: Optional[int]) -> Tuple[int, int]:
+    """Return ``(buckets, bucket_ms)`` for the bucketed window strategy."""
+    # Buckets are at least one millisecond long
+    buckets = min(precision or min(window, 60), window * 1000)
+    # Round the bucket size up so the buckets always cover the full window
+    bucket_ms = max(1, -(-window * 1000 // buckets))
+    return buckets, bucket_ms
+
+def sliding_window(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    reserve: float = 0.0,
+    **options: Any
+) -> Result:
+    now_ms = int(now * 1000)
+    window_ms = window * 1000
+    available = limit - math.floor(limit * reserve)
+    entries = state.setdefault("entries", deque())
+
+    window_start = now_ms - window_ms
+    while entries and entries[0] <= window_start:
+        entries.popleft()
+
+    current_count = len(entries)
+    if current_count + increment <= available:
+        entries.extend([now_ms] * increment)
+        state["expires_at"] = now + window
+        return True, available - (current_count + increment), 0
+
+    retry_after = 0
+    if entries:
+        retry_after = max(0, math.ceil((entries[0] + window_ms - now_ms) / 1000))
+    return False, 0, retry_after
+
+def token_bucket(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    capacity: Optional[int] = None,
+    reserve: float = 0.0,
+    **options: Any
+) -> Result:
+    now_s = int(now)
+    fill_rate = limit / window
+    capacity = capacity or limit
+    reserved = math.floor(capacity * reserve)
+
+    tokens = state.get("tokens", capacity)
+    last_refill = state.get("last_refill", now_s)
+
+    delta = max(0, now_s - last_refill)
+    tokens = min(capacity, tokens + (delta * fill_rate))
+
+    allowed = False
+    remaining = max(0, tokens - reserved)
+    retry_after = 0
+    if tokens - reserved >= increment:
+        tokens = tokens - increment
+        allowed = True
+        remaining = tokens - reserved
+    else:
+        retry_after = math.ceil((increment + reserved - tokens) / fill_rate)
+
+    state["tokens"] = tokens
+    state["last_refill"] = now_s
+    state["expires_at"] = now + math.ceil(capacity / fill_rate) + 10
+    return allowed, math.floor(remaining), retry_after
+
+def fixed_window(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    reserve: float = 0.0,
+    **options: Any
+) -> Result:
+    reserved = math.floor(limit * reserve)
+    available = limit - reserved
+    current = state.get("count")
+    if (current is not None or reserved > 0) and (current or 0) + increment > available:
+        if current is None:
+            return False, 0, window
+        # Redis TTL rounds the remaining milliseconds to the nearest second
+        ttl_ms = max(0, int((state["expires_at"] - now) * 1000))
+        return False, 0, (ttl_ms + 500) // 1000
+
+    new_val = (current or 0) + increment
+    state["count"] = new_val
+    if new_val == increment:
+        state["expires_at"] = now + window
+    return True, available - new_val, 0
+
+def leaky_bucket(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    capacity: Optional[int] = None,
+    reserve: float = 0.0,
+    **options: Any
+) -> Result:
+    now_s = int(now)
+    leak_rate = limit / window
+    capacity = capacity or limit
+    available = capacity - math.floor(capacity * reserve)
+
+    level = state.get("level", 0)
+    last_leak = state.get("last_leak", now_s)
+
+    delta = max(0, now_s - last_leak)
+    level = max(0, level - (delta * leak_rate))
+
+    allowed = False
+    remaining = max(0, available - level)
+    retry_after = 0
+    if level + increment <= available:
+        level = level + increment
+        allowed = True
+        remaining = available - level
+    else:
+        retry_after = math.ceil((level + increment - available) / leak_rate)
+
+    state["level"] = level
+    state["last_leak"] = now_s
+    state["expires_at"] = now + math.ceil(capacity / leak_rate) + 10
+    return allowed, math.floor(remaining), retry_after
+
+def bucketed_window(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    precision: Optional[int] = None,
+    reserve: float = 0.0,
+    **options: Any
+) -> Result:
+    now_ms = int(now * 1000)
+    buckets, bucket_ms = bucket_layout(window, precision)
+    available = limit - math.floor(limit * reserve)
+    slots: Dict[int, int] = state.setdefault("slots", {})
+
+    current_slot = now_ms // bucket_ms
+    oldest_slot = current_slot - buckets
+
+    total = 0
+    for slot in list(slots):
+        if slot < oldest_slot:
+            del slots[slot]
+        else:
+            total += slots[slot]
+
+    if total + increment <= available:
+        slots[current_slot] = slots.get(current_slot, 0) + increment
+        state["expires_at"] = now + (buckets + 1) * bucket_ms / 1000
+        return True, available - (total + increment), 0
+
+    needed = total + increment - available
+    retry_after = 0
+    for slot in sorted(slots):
+        needed -= slots[slot]
+        if needed <= 0:
+            retry_after = max(0, math.ceil(((slot + buckets + 1) * bucket_ms - now_ms) / 1000))
+            break
+    return False, 0, retry_after
+
+STRATEGIES: Dict[str, Callable[..., Result]] = {
+    "sliding_window": sliding_window,
+    "token_bucket": token_bucket,
+    "fixed_window": fixed_window,
+    "leaky_bucket": leaky_bucket,
+    "bucketed_window": bucketed_window,
+}
+
+
+def hierarchical_quota(
+    states: List[Dict[str, Any]],
+    now: float,
+    levels: List[Tuple[int, int, bool]],
+    increment: int = 1,
+) -> Tuple[bool, int, int, int]:
+    """
+    Fixed-window counters for nested budgets; ``states`` and ``levels`` (limit, window,
+    borrow) are ordered from root to leaf. Returns
+    ``(is_allowed, violated_level, remaining_requests, retry_after)`` where
+    ``violated_level`` is 0-based, or -1 when the request is admitted.
+    """
+    violated = -1
+    retry_after = 0
+    for i, (state, (limit, window, borrow)) in enumerate(zip(states, levels)):
+        current = state.get("count", 0)
+        if current + increment > limit and (not borrow or i == 0):
+            ttl_ms = max(0, int((state["expires_at"] - now) * 1000)) if "expires_at" in state else 0
+            ttl = (ttl_ms + 500) // 1000
+            if violated < 0 or ttl > retry_after:
+                violated = i
+                retry_after = ttl
+
+    if violated >= 0:
+        return False, violated, 0, retry_after
+
+    remaining = -1
+    for state, (limit, window, borrow) in zip(states, levels):
+        new_val = state.get("count", 0) + increment
+        state["count"] = new_val
+        if new_val == increment:
+            state["expires_at"] = now + window
+        left = max(0, limit - new_val)
+        if remaining < 0 or left < remaining:
+            remaining = left
+    return True, -1, remaining, 0
+
+
+def gcra_schedule(
+    state: Dict[str, Any],
+    now: float,
+    limit: int,
+    window: int,
+    increment: int = 1,
+    capacity: Optional[int] = None,
+    max_wait: float = 0.0,
+    reserve: float = 0.0,
+) -> Result:
+    """
+    GCRA scheduler used for traffic shaping. Returns
+    ``(is_allowed, remaining_requests, wait_ms)`` when a slot was reserved, or
+    ``(False, 0, retry_after)`` when the wait would exceed ``max_wait`` (seconds).
+    """
+    now_ms = int(now * 1000)
+    interval = window * 1000 / limit
+    burst = capacity or limit
+    available = burst - math.floor(burst * reserve)
+    max_wait_ms = int(max_wait * 1000)
+
+    tat = max(state.get("tat", now_ms), now_ms)
+    new_tat = tat + interval * increment
+    wait = max(0, new_tat - now_ms - interval * available)
+
+    if wait > max_wait_ms:
+        return False, 0, math.ceil((wait - max_wait_ms) / 1000)
+
+    state["tat"] = new_tat
+    state["expires_at"] = now + math.ceil(new_tat - now_ms) / 1000
+    remaining = max(0, math.floor((interval * available - (new_tat - now_ms)) / interval))
+    return True, remaining, math.ceil(wait)
+
+
+def block(state: Dict[str, Any], now: float, duration: float) -> int:
+    """
+    Block a key until ``now + duration`` (seconds) unless an existing block lasts longer.
+    Returns the remaining block in milliseconds.
+    """
+    now_ms = int(now * 1000)
+    duration_ms = int(duration * 1000)
+    blocked_until = state.get("until", 0)
+    if now_ms + duration_ms > blocked_until:
+        blocked_until = state["until"] = now_ms + duration_ms
+        state["expires_at"] = now + duration_ms / 1000
+    return blocked_until - now_ms
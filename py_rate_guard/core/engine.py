@@ -1,78 +1,239 @@
+import asyncio
 import logging
 import time
-from typing import List, Tuple, Optional, Any
+from typing import Any, Awaitable, Callable, List, Tuple, Optional
 from py_rate_guard.storage.base import BaseStorage
-from py_rate_guard.storage.redis import RedisStorage
 from py_rate_guard.storage.memory import MemoryStorage
-from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
-from py_rate_guard.exceptions import RateLimitExceeded, StorageError
-from py_rate_guard.observability.metrics import RateGuardLogger, REDIS_LATENCY
+from py_rate_guard.models.config import HierarchicalQuota, QuotaLevel, RateGuardConfig, RateLimitRule
+from py_rate_guard.exceptions import ConfigurationError, RateLimitExceeded, StorageError
+from py_rate_guard.observability import metrics
+from py_rate_guard.observability.metrics import RateGuardLogger
+from py_rate_guard.observability.instrumentation import Instrumentation
 from py_rate_guard.resolvers.default import BaseResolver
 
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    def __init__(self, config: RateGuardConfig):
+    def __init__(self, config: RateGuardConfig, storage: Optional[BaseStorage] = None):
         self.config = config
-        self.storage: BaseStorage = RedisStorage(config.redis)
+        if storage is None:
+            # Imported here so that the redis client is only loaded when it is used.
+            from py_rate_guard.storage.redis import RedisStorage
+            storage = RedisStorage(config.redis)
+        self.storage: BaseStorage = storage
         self.fallback_storage: Optional[BaseStorage] = None
         self.rg_logger = RateGuardLogger()
+        self.instrumentation = Instrumentation(
+            enabled=config.instrumentation,
+            opentelemetry=config.opentelemetry
+        )
         if config.in_memory_fallback:
             self.fallback_storage = MemoryStorage()
+        # Requests currently sleeping in shaping mode
+        self._queued = 0
+
+    async def _call_storage(
+        self,
+        operation: Callable[[BaseStorage, Any], Awaitable[Any]],
+        full_key: str,
+        **attributes: Any
+    ) -> Optional[Any]:
+        """
+        Run ``operation(storage, stage)`` on the primary storage, degrading to the
+        fallback storage on StorageError. Returns None when failing open.
+        """
+        instrumentation = self.instrumentation
+        try:
+            with instrumentation.stage("storage", **attributes) as stage:
+                start_time = time.perf_counter()
+                result = await operation(self.storage, stage)
+                metrics.REDIS_LATENCY.observe(time.perf_counter() - start_time)
+                return result
+        except StorageError as e:
+            logger.warning(f"Rate limiter primary storage error: {e}")
+            if self.config.graceful_degradation and self.fallback_storage:
+                logger.info(f"Falling back to memory storage for key {full_key}")
+                with instrumentation.stage("fallback", **attributes) as stage:
+                    return await operation(self.fallback_storage, stage)
+            elif self.config.fail_open:
+                logger.warning("Primary storage failed and no fallback available, failing open")
+                return None
+            else:
+                logger.error("Primary storage failed, no fallback, and fail_open is False")
+                raise
 
     async def check(
         self, 
         key: str, 
-        rules: List[RateLimitRule]
+        rules: List[RateLimitRule],
+        priority: Optional[int] = None,
+        cost: int = 1,
+        log_violations: bool = True
     ) -> Tuple[bool, Optional[RateLimitRule], int]:
         """
-        Check all rules for a given key.
+        Check all rules for a given key, charging ``cost`` units against each.
+        ``priority`` selects how much of each rule's reserved capacity the request may use.
+        With ``log_violations=False`` a denial is not logged or counted, for callers that
+        retry with a smaller cost.
+        Rules in "shape" mode reserve a future slot and this call sleeps until it comes up.
         Returns: (is_allowed, violated_rule, retry_after)
         """
         if not self.config.enabled:
             return True, None, 0
 
-        for rule in rules:
-            full_key = f"{rule.key_prefix}:{key}:{rule.limit}"
+        instrumentation = self.instrumentation
+        delay, shaped_rule = 0.0, None
+        queued = False
+        try:
+            for rule in rules:
+                shape = rule.mode == "shape"
+                strategy = "gcra" if shape else rule.strategy
+                with instrumentation.stage("rule_lookup", rule=rule.limit, strategy=strategy):
+                    full_key = f"{rule.key_prefix}:{key}:{rule.limit}"
+                    limit, window = rule.requests, rule.window_seconds
+                    reserve = rule.reserved_fraction(priority)
             
-            allowed, remaining, retry_after = False, 0, 0
-            
-            try:
-                start_time = time.perf_counter()
-                allowed, remaining, retry_after = await self.storage.check_and_increment(
-                    key=full_key,
-                    limit=rule.requests,
-                    window=rule.window_seconds,
-                    strategy=rule.strategy,
-                    capacity=rule.capacity
-                )
-                REDIS_LATENCY.observe(time.perf_counter() - start_time)
-            except StorageError as e:
-                logger.warning(f"Rate limiter primary storage error: {e}")
-                if self.config.graceful_degradation and self.fallback_storage:
-                    logger.info(f"Falling back to memory storage for key {full_key}")
-                    allowed, remaining, retry_after = await self.fallback_storage.check_and_increment(
+                if shape:
+                    # Take a queue place before reserving a slot, so that a reserved slot is
+                    # never rejected afterwards; without a place, admit only without waiting
+                    if not queued and self._queued < self.config.max_queued:
+                        self._queued += 1
+                        queued = True
+                    max_wait = rule.max_wait if queued else 0.0
+                    operation = lambda storage, stage: storage.schedule(
+                        key=full_key,
+                        limit=limit,
+                        window=window,
+                        increment=cost,
+                        max_wait=max_wait,
+                        capacity=rule.capacity,
+                        reserve=reserve,
+                        stage=stage
+                    )
+                else:
+                    operation = lambda storage, stage: storage.check_and_increment(
                         key=full_key,
-                        limit=rule.requests,
-                        window=rule.window_seconds,
+                        limit=limit,
+                        window=window,
                         strategy=rule.strategy,
-                        capacity=rule.capacity
+                        increment=cost,
+                        capacity=rule.capacity,
+                        precision=rule.bucket_count,
+                        reserve=reserve,
+                        stage=stage
                     )
-                elif self.config.fail_open:
-                    logger.warning("Primary storage failed and no fallback available, failing open")
+                result = await self._call_storage(
+                    operation,
+                    full_key,
+                    rule=rule.limit,
+                    strategy=strategy
+                )
+                if result is None:
                     return True, None, 0
-                else:
-                    logger.error("Primary storage failed, no fallback, and fail_open is False")
-                    raise
+                allowed, remaining, retry_after = result
+                if allowed and shape:
+                    if retry_after > delay:
+                        delay, shaped_rule = retry_after, rule
+                    retry_after = 0
 
-            if not allowed:
-                self.rg_logger.log_violation(key, rule, retry_after)
-                return False, rule, retry_after
+                with instrumentation.stage("report", rule=rule.limit, strategy=rule.strategy):
+                    if not allowed:
+                        if log_violations:
+                            self.rg_logger.log_violation(key, rule, retry_after)
+                    else:
+                        self.rg_logger.log_allowed(rule)
+
+                if not allowed:
+                    return False, rule, retry_after
 
-            self.rg_logger.log_allowed(rule)
+            if delay > 0:
+                with instrumentation.stage("queue", rule=shaped_rule.limit, strategy="gcra"):
+                    await asyncio.sleep(delay)
+            return True, None, 0
+        finally:
+            if queued:
+                self._queued -= 1
+
+    async def check_hierarchy(
+        self,
+        keys: List[str],
+        quota: HierarchicalQuota,
+        cost: int = 1
+    ) -> Tuple[bool, Optional[QuotaLevel], int]:
+        """
+        Check and charge every level of a hierarchical quota in one atomic storage call.
+        ``keys`` holds one key per level, ordered like ``quota.levels`` (root first).
+        Returns: (is_allowed, violated_level, retry_after)
+        """
+        if not self.config.enabled:
+            return True, None, 0
+        if len(keys) != len(quota.levels):
+            raise ConfigurationError(
+                f"Expected {len(quota.levels)} keys for hierarchical quota, got {len(keys)}"
+            )
+
+        instrumentation = self.instrumentation
+        with instrumentation.stage("rule_lookup", rule="hierarchical", strategy="hierarchical"):
+            # The root key is used as a hash tag so that all levels share a cluster slot
+            full_keys = [
+                f"{quota.key_prefix}:{{{keys[0]}}}:{level.name}:{':'.join(keys[:i + 1])}"
+                for i, level in enumerate(quota.levels)
+            ]
+            levels = [(level.requests, level.window_seconds, level.borrow) for level in quota.levels]
+
+        result = await self._call_storage(
+            lambda storage, stage: storage.check_hierarchy(
+                keys=full_keys,
+                levels=levels,
+                increment=cost,
+                stage=stage
+            ),
+            full_keys[-1],
+            rule="hierarchical",
+            strategy="hierarchical"
+        )
+        if result is None:
+            return True, None, 0
+        allowed, violated, remaining, retry_after = result
+
+        with instrumentation.stage("report", rule="hierarchical", strategy="hierarchical"):
+            if not allowed:
+                level = quota.levels[violated]
+                self.rg_logger.log_violation(":".join(keys[:violated + 1]), level, retry_after)
+                return False, level, retry_after
+            for level in quota.levels:
+                self.rg_logger.log_allowed(level)
 
         return True, None, 0
 
+    async def block(self, key: str, seconds: float) -> float:
+        """
+        Pause every caller of ``key`` across all processes for ``seconds``, e.g. after an
+        upstream Retry-After. A longer existing block is kept.
+        Returns: remaining block in seconds
+        """
+        if not self.config.enabled:
+            return 0.0
+        result = await self._call_storage(
+            lambda storage, stage: storage.block(key=key, seconds=seconds, stage=stage),
+            key,
+            rule="block",
+            strategy="block"
+        )
+        return result or 0.0
+
+    async def blocked_for(self, key: str) -> float:
+        """Returns: remaining block on ``key`` in seconds, or 0 when it is not blocked"""
+        if not self.config.enabled:
+            return 0.0
+        result = await self._call_storage(
+            lambda storage, stage: storage.blocked_for(key=key, stage=stage),
+            key,
+            rule="block",
+            strategy="block"
+        )
+        return result or 0.0
+
     async def close(self):
         await self.storage.close()
         if self.fallback_storage:
@@ -0,0 +1,120 @@
+import asyncio
+import math
+import time
+from typing import Callable, Dict, Optional, Tuple
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.models.config import RateLimitRule
+
+class TokenLease:
+    """
+    Admits high-frequency events (e.g. WebSocket messages) from a local budget leased
+    from the shared limiter. Each refill charges up to ``lease_size`` units to the rule in
+    one storage call, so storage is consulted about once per lease instead of once per
+    event. A lease never holds more than the rule allows in ``lease_ttl`` seconds.
+    ``lease_ttl`` defaults to the rule's window: unused units then only expire once
+    their charge has left the window, so a lease's own client under the limit is never
+    refused.
+    In exchange, units leased near the end of a window may be spent in the next one,
+    admitting at most one lease more than the limit there. Events on one key should
+    share a single lease (see LeasePool): separate leases each hold back unused units.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        key: str,
+        rule: RateLimitRule,
+        lease_size: int = 10,
+        lease_ttl: Optional[float] = None,
+        priority: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limiter = limiter
+        self.key = key
+        self.rule = rule
+        self.lease_ttl = rule.window_seconds if lease_ttl is None else lease_ttl
+        # Never lease more than the rule allows over the lease's lifetime
+        rate = rule.requests / rule.window_seconds
+        self.lease_size = max(1, min(lease_size, math.ceil(rate * self.lease_ttl)))
+        self.priority = priority
+        self.clock = clock
+        self.tokens = 0
+        self.expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+    async def acquire(self, cost: int = 1) -> Tuple[bool, int]:
+        """
+        Take ``cost`` units, refilling the lease from the limiter when needed.
+        Returns: (is_allowed, retry_after)
+        """
+        # Concurrent events on a shared lease must not each take a refill
+        async with self._lock:
+            now = self.clock()
+            if self.expired(now):
+                self.tokens = 0
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return True, 0
+
+            # Lease a full chunk; near the limit fall back to just what this event needs.
+            # Only the final attempt is reported as a violation.
+            needed = cost - self.tokens
+            amount = max(self.lease_size, needed)
+            allowed, _, retry_after = await self.limiter.check(
+                self.key, [self.rule], self.priority, amount, log_violations=amount == needed
+            )
+            if not allowed and amount > needed:
+                amount = needed
+                allowed, _, retry_after = await self.limiter.check(
+                    self.key, [self.rule], self.priority, amount
+                )
+            if not allowed:
+                return False, retry_after
+
+            self.tokens += amount - cost
+            self.expires_at = now + self.lease_ttl
+            return True, 0
+
+class LeasePool:
+    """
+    One TokenLease per key, shared by every connection on that key in this process.
+    A connection that closes leaves its unused units in the lease for the key's other
+    and later connections; they expire with the lease. Expired leases are evicted
+    every ``lease_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        rule: RateLimitRule,
+        lease_size: int = 10,
+        lease_ttl: Optional[float] = None,
+        priority: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limiter = limiter
+        self.rule = rule
+        self.lease_size = lease_size
+        self.lease_ttl = rule.window_seconds if lease_ttl is None else lease_ttl
+        self.priority = priority
+        self.clock = clock
+        self._leases: Dict[str, TokenLease] = {}
+        self._next_sweep = clock() + self.lease_ttl
+
+    def get(self, key: str) -> TokenLease:
+        now = self.clock()
+        if now >= self._next_sweep:
+            self._leases = {k: lease for k, lease in self._leases.items() if not lease.expired(now)}
+            self._next_sweep = now + self.lease_ttl
+        lease = self._leases.get(key)
+        if lease is None:
+            lease = self._leases[key] = TokenLease(
+                self.limiter, key, self.rule, self.lease_size, self.lease_ttl, self.priority, self.clock
+            )
+        return lease
+
+    def __len__(self) -> int:
+        return len(self._leases)
@@ -0,0 +1,138 @@
+"""
+Client-side rate limiting for calls to third-party APIs.
+
+``OutboundLimiter`` waits for a slot under a ``RateLimitRule`` before each call. The
+budget lives in the limiter's storage, so every process calling the same vendor draws
+from one cluster-wide budget. Vendor responses are fed back into it: a ``Retry-After``
+or an exhausted ``X-RateLimit-Remaining`` blocks the key for every caller until the
+vendor's window resets, and a remaining budget that would run out before the reset at
+the rule's rate slows every caller down to the advertised rate.
+
+The httpx and aiohttp integrations live in ``py_rate_guard.adapters``.
+"""
+import asyncio
+import logging
+import math
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.exceptions import RateLimitExceeded
+from py_rate_guard.models.config import RateLimitRule
+
+logger = logging.getLogger(__name__)
+
+# X-RateLimit-Reset values above this are Unix timestamps rather than seconds from now
+EPOCH_THRESHOLD = 1_000_000_000
+
+def parse_retry_after(value: str, now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After value (delay in seconds or HTTP date) into seconds from now."""
+    now = time.time() if now is None else now
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+def parse_reset(value: str, now: Optional[float] = None) -> Optional[float]:
+    """Parse an X-RateLimit-Reset value (seconds from now or Unix timestamp) into seconds from now."""
+    now = time.time() if now is None else now
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > EPOCH_THRESHOLD:
+        reset -= now
+    return max(0.0, reset)
+
+class OutboundLimiter:
+    """
+    Waits for a cluster-wide slot before calling a rate-limited upstream.
+    Use a rule in "shape" mode to queue calls into evenly spaced slots; with a
+    rejecting rule ``acquire`` polls until the window frees up.
+    The rule is an upper bound. Vendor headers lower it at runtime by pausing the key
+    for ``reset / remaining`` seconds after each response. Calls already in flight are
+    not spaced out, so the advertised rate can be briefly exceeded by the number of
+    concurrent callers.
+    """
+
+    retry_after_header = "Retry-After"
+    remaining_header = "X-RateLimit-Remaining"
+    reset_header = "X-RateLimit-Reset"
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        rule: RateLimitRule,
+        max_wait: Optional[float] = None,
+        default_backoff: float = 1.0,
+        block_prefix: str = "rlb"
+    ):
+        self.limiter = limiter
+        self.rule = rule
+        # Total time acquire() may wait before raising RateLimitExceeded (None: no bound)
+        self.max_wait = max_wait
+        # Block applied on a 429 that carries no usable headers
+        self.default_backoff = default_backoff
+        self.block_prefix = block_prefix
+
+    def _block_key(self, key: str) -> str:
+        return f"{self.block_prefix}:{key}"
+
+    async def acquire(self, key: str) -> None:
+        """Wait until a call to ``key`` may be sent; raises RateLimitExceeded past ``max_wait``."""
+        deadline = None if self.max_wait is None else time.monotonic() + self.max_wait
+        while True:
+            wait = await self.limiter.blocked_for(self._block_key(key))
+            if wait <= 0:
+                allowed, _, retry_after = await self.limiter.check(key, [self.rule])
+                if allowed:
+                    return
+                wait = max(retry_after, 0.1)
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(self.rule.limit, math.ceil(wait), key)
+            await asyncio.sleep(wait)
+
+    def backoff_from(self, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Seconds every caller should pause according to a vendor response, or None."""
+        retry_after = headers.get(self.retry_after_header)
+        if retry_after and status in (429, 503):
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                return delay
+
+        remaining = headers.get(self.remaining_header)
+        reset = headers.get(self.reset_header)
+        if remaining is not None and reset:
+            try:
+                left = float(remaining)
+            except ValueError:
+                left = None
+            seconds = parse_reset(reset)
+            if left is not None and seconds is not None:
+                if left <= 0:
+                    return seconds
+                # Spread the calls left until the reset when that is slower than the rule
+                interval = seconds / left
+                if interval > self.rule.window_seconds / self.rule.requests:
+                    return interval
+
+        if status == 429:
+            return self.default_backoff
+        return None
+
+    async def update(self, key: str, status: int, headers: Mapping[str, str]) -> float:
+        """
+        Feed a vendor response back into the shared budget.
+        Returns: seconds ``key`` is now blocked for (0 if the response imposed no pause)
+        """
+        delay = self.backoff_from(status, headers)
+        if not delay:
+            return 0.0
+        logger.info(f"Upstream {key} asked to back off for {delay:.1f}s")
+        return await self.limiter.block(self._block_key(key), delay)
@@ -1,17 +1,22 @@
-from typing import List, Optional, Union, Dict, Any
-from pydantic import BaseModel, Field, validator
+from enum import IntEnum
+from typing import List, Literal, Optional, Union, Dict, Any
+from pydantic import BaseModel, Field, field_validator, model_validator, validator
 import re
 
-class RateLimitRule(BaseModel):
+class Priority(IntEnum):
+    """Built-in priority classes; higher values are more important."""
+    BACKGROUND = 0
+    NORMAL = 1
+    HIGH = 2
+    CRITICAL = 3
+
+class LimitSpec(BaseModel):
     limit: str  # e.g., "100/minute", "10/second"
-    capacity: Optional[int] = None  # For Token Bucket / Leaky Bucket
-    strategy: str = "sliding_window"
-    key_prefix: str = "rl"
-    
+
     @property
     def requests(self) -> int:
         return int(self.limit.split('/')[0])
-    
+
     @property
     def window_seconds(self) -> int:
         count, period = self.limit.split('/')
@@ -41,6 +46,73 @@ class RateLimitRule(BaseModel):
             
         raise ValueError(f"Invalid period in limit: {period}")
 
+class RateLimitRule(LimitSpec):
+    capacity: Optional[int] = None  # For Token Bucket / Leaky Bucket
+    strategy: str = "sliding_window"
+    key_prefix: str = "rl"
+    precision: Optional[int] = Field(default=None, ge=1)  # Sub-buckets per window for bucketed_window
+    # Priority class -> fraction of capacity only that class and higher ones may use
+    reserved: Dict[int, float] = Field(default_factory=dict)
+    # "shape" delays requests through a GCRA scheduler for up to max_wait seconds
+    # instead of rejecting them; burst size is `capacity` (defaults to the limit)
+    mode: Literal["reject", "shape"] = "reject"
+    max_wait: float = Field(default=0.0, ge=0)
+
+    @field_validator("reserved")
+    @classmethod
+    def _check_reserved(cls, value: Dict[int, float]) -> Dict[int, float]:
+        if any(not 0 <= fraction <= 1 for fraction in value.values()):
+            raise ValueError("Reserved fractions must be between 0 and 1")
+        if sum(value.values()) > 1:
+            raise ValueError("Reserved fractions must not add up to more than 1")
+        return value
+
+    @model_validator(mode="after")
+    def _check_precision(self) -> "RateLimitRule":
+        if self.precision is not None and self.precision > self.window_seconds * 1000:
+            raise ValueError("precision must not exceed one bucket per millisecond of the window")
+        return self
+
+    def reserved_fraction(self, priority: Optional[int] = None) -> float:
+        """
+        Fraction of capacity held back from ``priority`` for higher classes.
+        Requests without a priority are treated as ``Priority.NORMAL``.
+        """
+        if not self.reserved:
+            return 0.0
+        if priority is None:
+            priority = Priority.NORMAL
+        return min(1.0, sum(f for cls, f in self.reserved.items() if cls > priority))
+
+    @property
+    def bucket_count(self) -> int:
+        """
+        Number of sub-buckets used by the ``bucketed_window`` strategy.
+        More buckets track the window more precisely but use more memory per key.
+        Defaults to one bucket per second, capped at 60.
+        """
+        if self.precision is not None:
+            return self.precision
+        return max(1, min(self.window_seconds, 60))
+
+class QuotaLevel(LimitSpec):
+    """One level of a hierarchical quota, e.g. an organization, a user or an API key."""
+    name: str
+    borrow: bool = False  # May exceed its own limit while every ancestor has idle capacity
+
+    @property
+    def strategy(self) -> str:
+        return "hierarchical"
+
+class HierarchicalQuota(BaseModel):
+    """
+    Nested budgets checked and charged together in one atomic operation.
+    Levels are ordered from the root (e.g. organization) to the leaf (e.g. API key);
+    every request is counted against all of them using fixed windows.
+    """
+    levels: List[QuotaLevel] = Field(min_length=1)
+    key_prefix: str = "rlq"
+
 class RedisConfig(BaseModel):
     host: str = "localhost"
     port: int = 6379
@@ -53,6 +125,7 @@ class RedisConfig(BaseModel):
     master_name: Optional[str] = None
     connection_pool_size: int = 10
     timeout: float = 1.0
+    max_retries: int = 0  # Retries per operation when the connection could not be opened
 
 class RateGuardConfig(BaseModel):
     enabled: bool = True
@@ -61,6 +134,9 @@ class RateGuardConfig(BaseModel):
     graceful_degradation: bool = True
     in_memory_fallback: bool = False
     emit_headers: bool = True
+    instrumentation: bool = False  # Per-stage timing histograms
+    max_queued: int = 1000  # Max requests per process waiting in shaping mode
+    opentelemetry: bool = False  # Emit OpenTelemetry spans per stage (requires the extra)
     
     # Global rules applied to all requests
     global_rules: List[RateLimitRule] = Field(default_factory=list)
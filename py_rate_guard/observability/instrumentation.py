@@ -0,0 +1,98 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+from py_rate_guard.observability import metrics
+from py_rate_guard.utils.imports import require
+
+logger = logging.getLogger(__name__)
+
+# Hook signature: hook(stage_name, duration_seconds, attributes)
+StageHook = Callable[[str, float, Dict[str, Any]], None]
+
+class _NoopStage:
+    """Returned by a disabled Instrumentation; every operation is a no-op."""
+
+    def __enter__(self) -> "_NoopStage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+NOOP_STAGE = _NoopStage()
+
+class Stage:
+    """Times one stage of the request path and optionally wraps it in an OpenTelemetry span."""
+
+    def __init__(self, instrumentation: "Instrumentation", name: str, attributes: Dict[str, Any]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attributes = attributes
+        self._start = 0.0
+        self._span_cm: Any = None
+        self._span: Any = None
+
+    def __enter__(self) -> "Stage":
+        tracer = self.instrumentation.tracer
+        if tracer is not None:
+            self._span_cm = tracer.start_as_current_span(
+                f"rate_guard.{self.name}", attributes=self.attributes
+            )
+            self._span = self._span_cm.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        duration = time.perf_counter() - self._start
+        if self._span_cm is not None:
+            self._span.set_attributes(self.attributes)
+            self._span_cm.__exit__(exc_type, exc, tb)
+        self.instrumentation.record(self.name, duration, self.attributes)
+
+    def set(self, **attributes: Any) -> None:
+        """Attach extra attributes (e.g. retry counts) discovered while the stage runs."""
+        self.attributes.update(attributes)
+
+class Instrumentation:
+    """
+    Per-stage timing for the rate limiting request path.
+    Stages: resolve, rule_lookup, storage, fallback, report, queue and response_build.
+    When disabled, stage() returns a shared no-op context manager.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        opentelemetry: bool = False,
+        hooks: Optional[List[StageHook]] = None,
+    ):
+        self.enabled = enabled or opentelemetry or bool(hooks)
+        self.hooks: List[StageHook] = list(hooks or [])
+        self.tracer: Any = None
+        if opentelemetry:
+            trace = require("opentelemetry.trace", "opentelemetry")
+            self.tracer = trace.get_tracer("py_rate_guard")
+
+    def add_hook(self, hook: StageHook) -> None:
+        """Register a callable invoked with (stage, duration, attributes) after each stage."""
+        self.hooks.append(hook)
+        self.enabled = True
+
+    def stage(self, name: str, **attributes: Any) -> Any:
+        if not self.enabled:
+            return NOOP_STAGE
+        return Stage(self, name, attributes)
+
+    def record(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        metrics.STAGE_LATENCY.labels(
+            stage=name,
+            strategy=attributes.get("strategy", ""),
+            rule_name=attributes.get("rule", ""),
+        ).observe(duration)
+        for hook in self.hooks:
+            try:
+                hook(name, duration, attributes)
+            except Exception:
+                logger.exception(f"Instrumentation hook failed for stage {name}")
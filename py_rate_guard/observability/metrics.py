@@ -2,26 +2,81 @@ import logging
 import json
 import time
 from typing import Any, Dict, Optional
-from prometheus_client import Counter, Histogram
-
-# Metrics
-REQUESTS_ALLOWED = Counter(
-    "rate_guard_requests_allowed_total",
-    "Total number of allowed requests",
-    ["rule_name", "strategy"]
-)
-
-REQUESTS_BLOCKED = Counter(
-    "rate_guard_requests_blocked_total",
-    "Total number of blocked requests",
-    ["rule_name", "strategy", "key"]
-)
-
-REDIS_LATENCY = Histogram(
-    "rate_guard_redis_latency_seconds",
-    "Latency of Redis operations for rate limiting",
-    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5]
-)
+from py_rate_guard.utils.imports import optional
+
+# Metric definitions. The prometheus_client objects are created on first use so that
+# importing the engine stays cheap; without the ``prometheus`` extra they become no-ops.
+_METRICS: Dict[str, tuple] = {
+    "REQUESTS_ALLOWED": (
+        "Counter",
+        "rate_guard_requests_allowed_total",
+        "Total number of allowed requests",
+        {"labelnames": ["rule_name", "strategy"]},
+    ),
+    "REQUESTS_BLOCKED": (
+        "Counter",
+        "rate_guard_requests_blocked_total",
+        "Total number of blocked requests",
+        {"labelnames": ["rule_name", "strategy", "key"]},
+    ),
+    "REDIS_LATENCY": (
+        "Histogram",
+        "rate_guard_redis_latency_seconds",
+        "Latency of Redis operations for rate limiting",
+        {"buckets": [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5]},
+    ),
+    "REDIS_RETRIES": (
+        "Counter",
+        "rate_guard_redis_retries_total",
+        "Redis script calls retried after a connection error or timeout",
+        {"labelnames": ["script"]},
+    ),
+    "REDIS_NOSCRIPT_RELOADS": (
+        "Counter",
+        "rate_guard_redis_noscript_reloads_total",
+        "Redis scripts reloaded after a NOSCRIPT error",
+        {"labelnames": ["script"]},
+    ),
+    "STAGE_LATENCY": (
+        "Histogram",
+        "rate_guard_stage_latency_seconds",
+        "Latency of each stage of the rate limiting request path",
+        {
+            "labelnames": ["stage", "strategy", "rule_name"],
+            "buckets": [0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5],
+        },
+    ),
+}
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is not installed."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+def _metric(name: str) -> Any:
+    metric = globals().get(name)
+    if metric is not None:
+        return metric
+    kind, metric_name, documentation, options = _METRICS[name]
+    prometheus_client = optional("prometheus_client")
+    if prometheus_client is None:
+        metric = _NoopMetric()
+    else:
+        metric = getattr(prometheus_client, kind)(metric_name, documentation, **options)
+    globals()[name] = metric
+    return metric
+
+def __getattr__(name: str) -> Any:
+    if name not in _METRICS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _metric(name)
 
 class RateGuardLogger:
     def __init__(self, name: str = "py-rate-guard"):
@@ -38,18 +93,18 @@ class RateGuardLogger:
         }
         if request_info:
             log_data.update(request_info)
-            
+
         self.logger.warning(json.dumps(log_data))
-        
+
         # Update metrics
-        REQUESTS_BLOCKED.labels(
+        _metric("REQUESTS_BLOCKED").labels(
             rule_name=rule.limit,
             strategy=rule.strategy,
             key=key
         ).inc()
 
     def log_allowed(self, rule: Any):
-        REQUESTS_ALLOWED.labels(
+        _metric("REQUESTS_ALLOWED").labels(
             rule_name=rule.limit,
             strategy=rule.strategy
         ).inc()
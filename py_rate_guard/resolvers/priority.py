@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from py_rate_guard.models.config import Priority
+
+class BasePriorityResolver(ABC):
+    @abstractmethod
+    async def resolve(self, request: Any) -> int:
+        """Resolve the priority class of the request; higher values are more important."""
+        pass
+
+class StaticPriorityResolver(BasePriorityResolver):
+    def __init__(self, priority: int = Priority.NORMAL):
+        self.priority = priority
+
+    async def resolve(self, request: Any) -> int:
+        return self.priority
+
+class HeaderPriorityResolver(BasePriorityResolver):
+    def __init__(
+        self,
+        header_name: str,
+        classes: Optional[Dict[str, int]] = None,
+        default: int = Priority.NORMAL
+    ):
+        self.header_name = header_name
+        self.classes = classes or {p.name.lower(): int(p) for p in Priority}
+        self.default = default
+
+    async def resolve(self, request: Any) -> int:
+        headers = getattr(request, "headers", {})
+        # FastAPI/Starlette uses headers mapping, Django uses META
+        if hasattr(headers, "get"):
+            val = headers.get(self.header_name)
+        else:
+            val = getattr(request, "META", {}).get(f"HTTP_{self.header_name.upper().replace('-', '_')}")
+
+        if val is None:
+            return self.default
+        return self.classes.get(val.lower(), self.default)
+
+class PathPriorityResolver(BasePriorityResolver):
+    """Assigns priorities by URL path prefix; the longest matching prefix wins."""
+
+    def __init__(self, prefixes: Dict[str, int], default: int = Priority.NORMAL):
+        self.prefixes = sorted(prefixes.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default = default
+
+    async def resolve(self, request: Any) -> int:
+        url = getattr(request, "url", None)
+        path = getattr(url, "path", None) or getattr(request, "path", "")
+        for prefix, priority in self.prefixes:
+            if path.startswith(prefix):
+                return priority
+        return self.default
@@ -0,0 +1,238 @@
+"""
+Offline traffic replay for comparing rate limiting strategies.
+
+A recorded request log is streamed once through every strategy on a virtual clock,
+using the same algorithms as ``MemoryStorage`` (which mirror the Redis Lua scripts),
+so decisions match the real backends while running far faster than real time.
+
+    python -m py_rate_guard.simulation.simulator trace.csv --limit 100/minute
+
+The trace is a CSV of ``timestamp,key[,cost]`` rows sorted by timestamp (seconds).
+"""
+import argparse
+import csv
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from py_rate_guard.core.algorithms import STRATEGIES, is_expired
+from py_rate_guard.models.config import RateLimitRule
+from py_rate_guard.utils.clock import VirtualClock
+
+# Rough per-key Redis memory model (bytes), used for sizing rather than exact accounting.
+KEY_OVERHEAD_BYTES = 72  # dict entry, key object and expiry entry
+SMALL_ZSET_ENTRY_BYTES = 40  # listpack encoding (<= 128 members)
+LARGE_ZSET_ENTRY_BYTES = 96  # skiplist + dict encoding
+ZSET_LISTPACK_MAX_ENTRIES = 128
+HASH_FIELD_BYTES = 24
+SMALL_HASH_BYTES = 80
+STRING_COUNTER_BYTES = 16
+
+class TraceEvent(NamedTuple):
+    timestamp: float
+    key: str
+    cost: int = 1
+
+def load_trace(path: str) -> Iterator[TraceEvent]:
+    """Stream ``TraceEvent``s from a CSV file; a header row is skipped automatically."""
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            try:
+                timestamp = float(row[0])
+            except ValueError:
+                continue  # header
+            cost = int(row[2]) if len(row) > 2 and row[2] else 1
+            yield TraceEvent(timestamp, row[1], cost)
+
+def estimate_key_memory(strategy: str, key: str, state: Dict[str, Any]) -> int:
+    size = KEY_OVERHEAD_BYTES + len(key)
+    if strategy == "sliding_window":
+        entries = len(state.get("entries", ()))
+        per_entry = (
+            SMALL_ZSET_ENTRY_BYTES if entries <= ZSET_LISTPACK_MAX_ENTRIES else LARGE_ZSET_ENTRY_BYTES
+        )
+        return size + entries * per_entry
+    if strategy == "bucketed_window":
+        return size + len(state.get("slots", ())) * HASH_FIELD_BYTES
+    if strategy == "fixed_window":
+        return size + STRING_COUNTER_BYTES
+    return size + SMALL_HASH_BYTES
+
+def estimate_commands(strategy: str, allowed: bool, cost: int, state: Dict[str, Any]) -> int:
+    """Number of Redis commands the strategy's Lua script issues for one check."""
+    if strategy == "sliding_window":
+        # ZREMRANGEBYSCORE + ZCARD, then ZADD per unit + PEXPIRE, or ZRANGE
+        return 2 + (cost + 1 if allowed else 1)
+    if strategy == "fixed_window":
+        # GET, then INCRBY (+ EXPIRE on the first hit of a window), or TTL
+        if allowed:
+            return 3 if state.get("count") == cost else 2
+        return 2
+    if strategy == "bucketed_window":
+        # HGETALL, then HINCRBY + PEXPIRE when admitted (HDEL of expired buckets not counted)
+        return 3 if allowed else 1
+    # token_bucket / leaky_bucket: HMGET + HMSET + EXPIRE
+    return 3
+
+class StrategyReport:
+    """Accumulated results of replaying a trace through one strategy."""
+
+    def __init__(self, strategy: str):
+        self.strategy = strategy
+        self.requests = 0
+        self.admitted = 0
+        self.denied = 0
+        self.admitted_cost = 0
+        self.denied_cost = 0
+        self.max_burst = 0  # Largest admitted cost for one key within any window
+        self.burst_overshoot = 0  # max_burst above the configured limit
+        self.redis_commands = 0
+        self.peak_keys = 0
+        self.peak_memory_bytes = 0
+        self.final_memory_bytes = 0
+
+    @property
+    def round_trips(self) -> int:
+        # One EVALSHA per check
+        return self.requests
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = dict(vars(self))
+        data["round_trips"] = self.round_trips
+        return data
+
+class Simulator:
+    """Streams trace events through several strategies for a single rule."""
+
+    def __init__(
+        self,
+        rule: RateLimitRule,
+        strategies: Optional[Iterable[str]] = None,
+        sample_every: int = 10_000,
+    ):
+        self.rule = rule
+        self.limit = rule.requests
+        self.window = rule.window_seconds
+        self.strategies = list(strategies or STRATEGIES)
+        unknown = [s for s in self.strategies if s not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Unsupported strategies: {', '.join(unknown)}")
+        self.sample_every = sample_every
+        self.clock = VirtualClock()
+        self.reports = {s: StrategyReport(s) for s in self.strategies}
+        self._states: Dict[str, Dict[str, Dict[str, Any]]] = {s: {} for s in self.strategies}
+        # Per strategy and key: [admitted (timestamp, cost) within the window, their total cost]
+        self._admitted: Dict[str, Dict[str, List[Any]]] = {s: {} for s in self.strategies}
+        self._events = 0
+
+    def feed(self, event: TraceEvent) -> Dict[str, bool]:
+        """Evaluate one event under every strategy; returns the decision per strategy."""
+        self.clock.set(event.timestamp)
+        now = self.clock.time()
+        decisions = {}
+        for strategy in self.strategies:
+            states = self._states[strategy]
+            state = states.get(event.key)
+            if state is None or is_expired(state, now):
+                state = states[event.key] = {}
+
+            allowed, _, _ = STRATEGIES[strategy](
+                state,
+                now,
+                self.limit,
+                self.window,
+                event.cost,
+                capacity=self.rule.capacity,
+                precision=self.rule.bucket_count,
+            )
+
+            report = self.reports[strategy]
+            report.requests += 1
+            report.redis_commands += estimate_commands(strategy, allowed, event.cost, state)
+            if allowed:
+                report.admitted += 1
+                report.admitted_cost += event.cost
+                self._track_burst(strategy, report, event, now)
+            else:
+                report.denied += 1
+                report.denied_cost += event.cost
+            decisions[strategy] = allowed
+
+        self._events += 1
+        if self.sample_every and self._events % self.sample_every == 0:
+            self._sample_memory()
+        return decisions
+
+    def run(self, events: Iterable[TraceEvent]) -> Dict[str, StrategyReport]:
+        for event in events:
+            self.feed(event)
+        return self.finish()
+
+    def finish(self) -> Dict[str, StrategyReport]:
+        self._sample_memory(final=True)
+        return self.reports
+
+    def _track_burst(self, strategy: str, report: StrategyReport, event: TraceEvent, now: float):
+        entry = self._admitted[strategy].setdefault(event.key, [deque(), 0])
+        history: Deque[Tuple[float, int]] = entry[0]
+        history.append((now, event.cost))
+        entry[1] += event.cost
+        window_start = now - self.window
+        while history and history[0][0] <= window_start:
+            entry[1] -= history.popleft()[1]
+        if entry[1] > report.max_burst:
+            report.max_burst = entry[1]
+            report.burst_overshoot = max(0, entry[1] - self.limit)
+
+    def _sample_memory(self, final: bool = False):
+        now = self.clock.time()
+        for strategy in self.strategies:
+            states = self._states[strategy]
+            # Drop keys Redis would have expired through their TTL
+            for key in [k for k, state in states.items() if is_expired(state, now)]:
+                del states[key]
+            memory = sum(estimate_key_memory(strategy, k, s) for k, s in states.items())
+            report = self.reports[strategy]
+            report.peak_keys = max(report.peak_keys, len(states))
+            report.peak_memory_bytes = max(report.peak_memory_bytes, memory)
+            if final:
+                report.final_memory_bytes = memory
+
+def simulate(
+    events: Iterable[TraceEvent],
+    rule: RateLimitRule,
+    strategies: Optional[Iterable[str]] = None,
+) -> Dict[str, StrategyReport]:
+    """Replay ``events`` through each strategy (all by default) and return per-strategy reports."""
+    return Simulator(rule, strategies).run(events)
+
+def format_reports(reports: Dict[str, StrategyReport]) -> str:
+    columns = [
+        ("strategy", 16), ("admitted", 10), ("denied", 10), ("max_burst", 10),
+        ("burst_overshoot", 16), ("redis_commands", 15), ("round_trips", 12),
+        ("peak_keys", 10), ("peak_memory_bytes", 18),
+    ]
+    lines = [" ".join(f"{name:>{width}}" for name, width in columns)]
+    for report in reports.values():
+        data = report.as_dict()
+        lines.append(" ".join(f"{data[name]:>{width}}" for name, width in columns))
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a request trace through rate limiting strategies.")
+    parser.add_argument("trace", help="CSV file with timestamp,key[,cost] rows")
+    parser.add_argument("--limit", required=True, help='Rule limit, e.g. "100/minute"')
+    parser.add_argument("--capacity", type=int, default=None)
+    parser.add_argument("--precision", type=int, default=None)
+    parser.add_argument(
+        "--strategy", action="append", dest="strategies", choices=sorted(STRATEGIES),
+        help="Strategy to simulate (repeatable, default: all)",
+    )
+    args = parser.parse_args(argv)
+
+    rule = RateLimitRule(limit=args.limit, capacity=args.capacity, precision=args.precision)
+    print(format_reports(simulate(load_trace(args.trace), rule, args.strategies)))
+
+if __name__ == "__main__":
+    main()
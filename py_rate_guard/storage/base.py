@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+from py_rate_guard.exceptions import StorageError
 
 class BaseStorage(ABC):
     @abstractmethod
@@ -18,6 +19,50 @@ class BaseStorage(ABC):
         """
         pass
 
+    async def check_hierarchy(
+        self,
+        keys: List[str],
+        levels: List[Tuple[int, int, bool]],
+        increment: int = 1,
+        **kwargs
+    ) -> Tuple[bool, int, int, int]:
+        """
+        Atomically check and charge nested fixed-window quotas.
+        ``keys`` and ``levels`` (limit, window, borrow) are ordered from root to leaf.
+        Returns: (is_allowed, violated_level, remaining_requests, retry_after)
+        where violated_level is the 0-based level index, or -1 if allowed.
+        """
+        raise StorageError(f"{type(self).__name__} does not support hierarchical quotas")
+
+    async def schedule(
+        self,
+        key: str,
+        limit: int,
+        window: int,
+        increment: int = 1,
+        max_wait: float = 0.0,
+        **kwargs
+    ) -> Tuple[bool, int, float]:
+        """
+        Reserve the next free slot of a GCRA scheduler for traffic shaping.
+        Returns: (is_allowed, remaining_requests, wait_seconds) when a slot was reserved,
+        or (False, 0, retry_after) when the wait would exceed ``max_wait`` seconds.
+        """
+        raise StorageError(f"{type(self).__name__} does not support traffic shaping")
+
+    async def block(self, key: str, seconds: float, **kwargs) -> float:
+        """
+        Block ``key`` for ``seconds``, keeping an existing block that lasts longer.
+        Returns: remaining block in seconds
+        """
+        raise StorageError(f"{type(self).__name__} does not support blocking keys")
+
+    async def blocked_for(self, key: str, **kwargs) -> float:
+        """
+        Returns: remaining block on ``key`` in seconds, or 0 when it is not blocked
+        """
+        raise StorageError(f"{type(self).__name__} does not support blocking keys")
+
     @abstractmethod
     def close(self):
         pass
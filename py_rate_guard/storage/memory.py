@@ -1,12 +1,39 @@
-import time
 import asyncio
-from typing import Tuple, Dict, List, Optional
+from typing import Any, Tuple, Dict, List, Optional
+from py_rate_guard.core.algorithms import STRATEGIES, block, gcra_schedule, hierarchical_quota, is_expired
+from py_rate_guard.exceptions import StorageError
 from py_rate_guard.storage.base import BaseStorage
+from py_rate_guard.utils.clock import Clock, SYSTEM_CLOCK
 
 class MemoryStorage(BaseStorage):
-    def __init__(self):
-        self._data: Dict[str, List[float]] = {}
+    """
+    In-process storage using the same algorithms as the Redis scripts. Expired keys are
+    replaced when accessed, and every ``sweep_interval`` seconds all of them are evicted,
+    so idle keys do not accumulate.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None, sweep_interval: float = 60.0):
+        self._data: Dict[str, Dict[str, Any]] = {}
         self._lock = asyncio.Lock()
+        self.clock = clock or SYSTEM_CLOCK
+        self.sweep_interval = sweep_interval
+        self._next_sweep = self.clock.time() + sweep_interval
+
+    def _state(self, key: str, now: float) -> Dict[str, Any]:
+        """Return the live state of ``key``, sweeping expired keys when one is due."""
+        if now >= self._next_sweep:
+            self._sweep(now)
+        state = self._data.get(key)
+        if state is None or is_expired(state, now):
+            state = self._data[key] = {}
+        return state
+
+    def _sweep(self, now: float) -> None:
+        # Empty states are left behind by requests that were denied before writing anything
+        self._data = {
+            key: state for key, state in self._data.items() if state and not is_expired(state, now)
+        }
+        self._next_sweep = now + self.sweep_interval
 
     async def check_and_increment(
         self, 
@@ -17,24 +44,75 @@ class MemoryStorage(BaseStorage):
         increment: int = 1,
         **kwargs
     ) -> Tuple[bool, int, int]:
+        algorithm = STRATEGIES.get(strategy)
+        if algorithm is None:
+            raise StorageError(f"Unsupported strategy: {strategy}")
+
+        async with self._lock:
+            now = self.clock.time()
+            state = self._state(key, now)
+
+            # Same algorithms as the Redis Lua scripts, evaluated in-process
+            return algorithm(
+                state,
+                now,
+                limit,
+                window,
+                increment,
+                capacity=kwargs.get('capacity'),
+                precision=kwargs.get('precision'),
+                reserve=kwargs.get('reserve') or 0.0
+            )
+
+    async def check_hierarchy(
+        self,
+        keys: List[str],
+        levels: List[Tuple[int, int, bool]],
+        increment: int = 1,
+        **kwargs
+    ) -> Tuple[bool, int, int, int]:
+        async with self._lock:
+            now = self.clock.time()
+            states = [self._state(key, now) for key in keys]
+            return hierarchical_quota(states, now, levels, increment)
+
+    async def schedule(
+        self,
+        key: str,
+        limit: int,
+        window: int,
+        increment: int = 1,
+        max_wait: float = 0.0,
+        **kwargs
+    ) -> Tuple[bool, int, float]:
+        async with self._lock:
+            now = self.clock.time()
+            state = self._state(key, now)
+            allowed, remaining, wait = gcra_schedule(
+                state,
+                now,
+                limit,
+                window,
+                increment,
+                capacity=kwargs.get('capacity'),
+                max_wait=max_wait,
+                reserve=kwargs.get('reserve') or 0.0
+            )
+            return allowed, remaining, wait / 1000 if allowed else wait
+
+    async def block(self, key: str, seconds: float, **kwargs) -> float:
+        async with self._lock:
+            now = self.clock.time()
+            state = self._state(key, now)
+            return block(state, now, seconds) / 1000
+
+    async def blocked_for(self, key: str, **kwargs) -> float:
         async with self._lock:
-            now = time.time()
-            if key not in self._data:
-                self._data[key] = []
-            
-            # Simple Sliding Window implementation for memory
-            window_start = now - window
-            self._data[key] = [t for t in self._data[key] if t > window_start]
-            
-            if len(self._data[key]) + increment <= limit:
-                for _ in range(increment):
-                    self._data[key].append(now)
-                return True, limit - len(self._data[key]), 0
-            else:
-                retry_after = 0
-                if self._data[key]:
-                    retry_after = int(max(0, self._data[key][0] + window - now))
-                return False, 0, retry_after
+            now = self.clock.time()
+            state = self._data.get(key)
+            if state is None or is_expired(state, now):
+                return 0.0
+            return max(0, state.get("until", 0) - int(now * 1000)) / 1000
 
     async def close(self):
         self._data.clear()
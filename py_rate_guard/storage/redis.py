@@ -1,25 +1,61 @@
-import time
 import asyncio
-from typing import Tuple, Optional, Any
-import redis.asyncio as redis
-from redis.asyncio.cluster import RedisCluster
-from redis.asyncio.sentinel import Sentinel
+from typing import List, Tuple, Optional, Any
+from py_rate_guard.utils.imports import require
+
+redis = require("redis.asyncio", "redis")
+
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import NoScriptError, TimeoutError as RedisTimeoutError
 
 from py_rate_guard.storage.base import BaseStorage
 from py_rate_guard.utils.lua import (
     SLIDING_WINDOW_SCRIPT, 
     TOKEN_BUCKET_SCRIPT, 
     FIXED_WINDOW_SCRIPT,
-    LEAKY_BUCKET_SCRIPT
+    LEAKY_BUCKET_SCRIPT,
+    BUCKETED_WINDOW_SCRIPT,
+    HIERARCHICAL_QUOTA_SCRIPT,
+    GCRA_SCHEDULE_SCRIPT,
+    BLOCK_SCRIPT
 )
 from py_rate_guard.exceptions import StorageError
 from py_rate_guard.models.config import RedisConfig
+from py_rate_guard.observability import metrics
+from py_rate_guard.observability.instrumentation import NOOP_STAGE
+from py_rate_guard.core.algorithms import bucket_layout
+from py_rate_guard.utils.clock import Clock, SYSTEM_CLOCK
+
+SCRIPTS = {
+    'sliding_window': SLIDING_WINDOW_SCRIPT,
+    'token_bucket': TOKEN_BUCKET_SCRIPT,
+    'fixed_window': FIXED_WINDOW_SCRIPT,
+    'leaky_bucket': LEAKY_BUCKET_SCRIPT,
+    'bucketed_window': BUCKETED_WINDOW_SCRIPT,
+    'hierarchical_quota': HIERARCHICAL_QUOTA_SCRIPT,
+    'gcra_schedule': GCRA_SCHEDULE_SCRIPT,
+    'block': BLOCK_SCRIPT,
+}
+
+# Scripts that can safely run twice, so any connection error or timeout may be retried
+IDEMPOTENT_SCRIPTS = {'block'}
+
+def no_retry() -> Retry:
+    """
+    redis-py retries commands on connection errors and timeouts by default, including a
+    reply lost after the script ran. Retries are left to RedisStorage._run_script.
+    """
+    return Retry(NoBackoff(), 0)
 
 class RedisStorage(BaseStorage):
-    def __init__(self, config: RedisConfig):
+    def __init__(self, config: RedisConfig, clock: Optional[Clock] = None):
         self.config = config
         self.client: Optional[redis.Redis] = None
         self._scripts = {}
+        # Timestamps are passed to the scripts, so a virtual clock drives every strategy
+        # except fixed_window, which relies on the server-side key TTL.
+        self.clock = clock or SYSTEM_CLOCK
 
     async def connect(self):
         if self.client:
@@ -27,14 +63,17 @@ class RedisStorage(BaseStorage):
 
         try:
             if self.config.cluster:
+                from redis.asyncio.cluster import RedisCluster
                 self.client = RedisCluster(
                     host=self.config.host,
                     port=self.config.port,
                     password=self.config.password,
                     ssl=self.config.ssl,
-                    decode_responses=True
+                    decode_responses=True,
+                    retry=no_retry()
                 )
             elif self.config.sentinel:
+                from redis.asyncio.sentinel import Sentinel
                 sentinel = Sentinel(
                     self.config.sentinel_nodes,
                     password=self.config.password,
@@ -42,7 +81,8 @@ class RedisStorage(BaseStorage):
                 )
                 self.client = sentinel.master_for(
                     self.config.master_name,
-                    decode_responses=True
+                    decode_responses=True,
+                    retry=no_retry()
                 )
             else:
                 self.client = redis.Redis(
@@ -52,18 +92,20 @@ class RedisStorage(BaseStorage):
                     password=self.config.password,
                     ssl=self.config.ssl,
                     decode_responses=True,
-                    max_connections=self.config.connection_pool_size
+                    max_connections=self.config.connection_pool_size,
+                    retry=no_retry()
                 )
             
-            # Register scripts
-            self._scripts['sliding_window'] = self.client.register_script(SLIDING_WINDOW_SCRIPT)
-            self._scripts['token_bucket'] = self.client.register_script(TOKEN_BUCKET_SCRIPT)
-            self._scripts['fixed_window'] = self.client.register_script(FIXED_WINDOW_SCRIPT)
-            self._scripts['leaky_bucket'] = self.client.register_script(LEAKY_BUCKET_SCRIPT)
+            self.register_scripts()
             
         except Exception as e:
             raise StorageError(f"Failed to connect to Redis: {e}")
 
+    def register_scripts(self) -> None:
+        """Register every Lua script on the current client (loaded lazily via EVALSHA)."""
+        for name, script in SCRIPTS.items():
+            self._scripts[name] = self.client.register_script(script)
+
     async def check_and_increment(
         self, 
         key: str, 
@@ -76,35 +118,44 @@ class RedisStorage(BaseStorage):
         if not self.client:
             await self.connect()
 
+        stage = kwargs.get('stage') or NOOP_STAGE
+        reserve = kwargs.get('reserve') or 0
         try:
             if strategy == "sliding_window":
                 # Convert window and now to milliseconds
-                now = int(time.time() * 1000)
+                now = int(self.clock.time() * 1000)
                 window_ms = window * 1000
-                res = await self._scripts['sliding_window'](
+                res = await self._run_script('sliding_window', stage,
                     keys=[key], 
-                    args=[now, window_ms, limit, increment]
+                    args=[now, window_ms, limit, increment, reserve]
                 )
             elif strategy == "token_bucket":
-                now = int(time.time())
+                now = int(self.clock.time())
                 fill_rate = limit / window
-                capacity = kwargs.get('capacity', limit)
-                res = await self._scripts['token_bucket'](
+                capacity = kwargs.get('capacity') or limit
+                res = await self._run_script('token_bucket', stage,
                     keys=[key], 
-                    args=[now, fill_rate, capacity, increment]
+                    args=[now, fill_rate, capacity, increment, reserve]
                 )
             elif strategy == "fixed_window":
-                res = await self._scripts['fixed_window'](
+                res = await self._run_script('fixed_window', stage,
                     keys=[key], 
-                    args=[window, limit, increment]
+                    args=[window, limit, increment, reserve]
                 )
             elif strategy == "leaky_bucket":
-                now = int(time.time())
+                now = int(self.clock.time())
                 leak_rate = limit / window
-                capacity = kwargs.get('capacity', limit)
-                res = await self._scripts['leaky_bucket'](
+                capacity = kwargs.get('capacity') or limit
+                res = await self._run_script('leaky_bucket', stage,
                     keys=[key], 
-                    args=[now, leak_rate, capacity, increment]
+                    args=[now, leak_rate, capacity, increment, reserve]
+                )
+            elif strategy == "bucketed_window":
+                now = int(self.clock.time() * 1000)
+                buckets, bucket_ms = bucket_layout(window, kwargs.get('precision'))
+                res = await self._run_script('bucketed_window', stage,
+                    keys=[key],
+                    args=[now, bucket_ms, buckets, limit, increment, reserve]
                 )
             else:
                 raise StorageError(f"Unsupported strategy: {strategy}")
@@ -113,6 +164,128 @@ class RedisStorage(BaseStorage):
         except Exception as e:
             raise StorageError(f"Redis operation failed: {e}")
 
+    async def check_hierarchy(
+        self,
+        keys: List[str],
+        levels: List[Tuple[int, int, bool]],
+        increment: int = 1,
+        **kwargs
+    ) -> Tuple[bool, int, int, int]:
+        if not self.client:
+            await self.connect()
+
+        stage = kwargs.get('stage') or NOOP_STAGE
+        args = [increment]
+        for limit, window, borrow in levels:
+            args.extend([limit, window, int(borrow)])
+        try:
+            res = await self._run_script('hierarchical_quota', stage, keys=keys, args=args)
+            return bool(res[0]), int(res[1]) - 1, int(res[2]), int(res[3])
+        except Exception as e:
+            raise StorageError(f"Redis operation failed: {e}")
+
+    async def schedule(
+        self,
+        key: str,
+        limit: int,
+        window: int,
+        increment: int = 1,
+        max_wait: float = 0.0,
+        **kwargs
+    ) -> Tuple[bool, int, float]:
+        if not self.client:
+            await self.connect()
+
+        stage = kwargs.get('stage') or NOOP_STAGE
+        now = int(self.clock.time() * 1000)
+        interval = window * 1000 / limit
+        burst = kwargs.get('capacity') or limit
+        try:
+            res = await self._run_script('gcra_schedule', stage,
+                keys=[key],
+                args=[now, interval, burst, increment, int(max_wait * 1000), kwargs.get('reserve') or 0]
+            )
+            allowed = bool(res[0])
+            return allowed, int(res[1]), int(res[2]) / 1000 if allowed else int(res[2])
+        except Exception as e:
+            raise StorageError(f"Redis operation failed: {e}")
+
+    async def block(self, key: str, seconds: float, **kwargs) -> float:
+        if not self.client:
+            await self.connect()
+
+        stage = kwargs.get('stage') or NOOP_STAGE
+        now = int(self.clock.time() * 1000)
+        try:
+            res = await self._run_script('block', stage,
+                keys=[key],
+                args=[now, max(1, int(seconds * 1000))]
+            )
+            return int(res) / 1000
+        except Exception as e:
+            raise StorageError(f"Redis operation failed: {e}")
+
+    async def blocked_for(self, key: str, **kwargs) -> float:
+        if not self.client:
+            await self.connect()
+
+        try:
+            blocked_until = await self.client.get(key)
+        except Exception as e:
+            raise StorageError(f"Redis operation failed: {e}")
+        if blocked_until is None:
+            return 0.0
+        now = int(self.clock.time() * 1000)
+        return max(0, int(float(blocked_until)) - now) / 1000
+
+    async def _run_script(self, name: str, stage: Any, keys: list, args: list) -> Any:
+        """
+        Run a registered script via EVALSHA, loading it on NOSCRIPT and retrying
+        connection errors up to ``max_retries`` times. Counts are reported to the stage
+        and to the Prometheus metrics.
+        A timed-out or interrupted script may already have run and charged the key, so
+        non-idempotent scripts are only retried when no connection could be opened. To
+        tell the two apart, retried calls first take a connection of their own from the
+        pool; nothing has been sent when that fails.
+        """
+        script = self._scripts[name]
+        retries = 0
+        noscript_reloads = 0
+        # Cluster clients route per key and cannot hand out a single connection
+        pinned = self.config.max_retries > 0 and not self.config.cluster
+        try:
+            while True:
+                client = self.client.client() if pinned else self.client
+                try:
+                    if pinned:
+                        try:
+                            await client.initialize()
+                        except (RedisConnectionError, RedisTimeoutError):
+                            if retries >= self.config.max_retries:
+                                raise
+                            retries += 1
+                            metrics.REDIS_RETRIES.labels(script=name).inc()
+                            continue
+                    try:
+                        return await client.evalsha(script.sha, len(keys), *keys, *args)
+                    except NoScriptError:
+                        if noscript_reloads:
+                            raise
+                        noscript_reloads += 1
+                        metrics.REDIS_NOSCRIPT_RELOADS.labels(script=name).inc()
+                        await client.script_load(script.script)
+                    except (RedisConnectionError, RedisTimeoutError):
+                        if retries >= self.config.max_retries or name not in IDEMPOTENT_SCRIPTS:
+                            raise
+                        retries += 1
+                        metrics.REDIS_RETRIES.labels(script=name).inc()
+                finally:
+                    if pinned:
+                        # Returns the connection to the pool
+                        await client.aclose()
+        finally:
+            stage.set(retries=retries, noscript_reloads=noscript_reloads)
+
     async def close(self):
         if self.client:
             await self.client.close()
@@ -0,0 +1,402 @@
+"""
+Shared-memory storage for several worker processes on one host (POSIX only).
+
+Every worker maps the same file (e.g. under /dev/shm) holding a fixed-size
+open-addressing hash table, so per-host limits are exact without a network round trip.
+The table is split into segments. Each segment is guarded by a POSIX record lock (shared
+between processes) and a thread lock (for threads of one process), and a key only ever
+probes slots of its own segment. A slot holds the key's digest, its expiry time and the
+strategy state encoded with ``marshal``. The state is evaluated with the same algorithms
+as ``MemoryStorage``, so decisions match the Redis scripts.
+
+A full segment never drops a state silently: the request is denied and the overflow
+logged, because the engine would otherwise fail open on a storage error. Rules are
+sized up front from the ``rules`` given to the constructor.
+
+With a ``backend`` (usually ``RedisStorage``) the table acts as a near cache in front of
+it. The backend stays authoritative, but its denials are cached until their retry_after,
+so every worker on the host rejects a blocked key without a round trip.
+"""
+import fcntl
+import functools
+import hashlib
+import logging
+import marshal
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from py_rate_guard.core import algorithms
+from py_rate_guard.exceptions import ConfigurationError, StorageError
+from py_rate_guard.models.config import RateLimitRule
+from py_rate_guard.storage.base import BaseStorage
+from py_rate_guard.utils.clock import Clock, SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RGSHM001"
+# magic, slots, value_size, segments
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 64
+# key digest, expires_at, payload length
+SLOT_HEADER = struct.Struct("<16sdI")
+EMPTY_DIGEST = bytes(16)
+NEVER_EXPIRES = float("inf")
+# Expiry written for slots whose state was emptied; they are reused like expired ones
+RELEASED = float("-inf")
+DEFAULT_VALUE_SIZE = 1024
+# Retry hint for requests denied because their state could not be stored
+OVERFLOW_RETRY_AFTER = 1
+# Scalar fields of each state besides expires_at
+STATE_FIELDS = {
+    "token_bucket": ("tokens", "last_refill"),
+    "fixed_window": ("count",),
+    "leaky_bucket": ("level", "last_leak"),
+    "gcra_schedule": ("tat",),
+    "hierarchical_quota": ("count",),
+    "block": ("until",),
+}
+# Stand-in for the largest integers a state holds (millisecond timestamps and slots)
+LARGE = 2 ** 62
+
+def encode_state(state: Dict[str, Any]) -> bytes:
+    data = dict(state)
+    entries = data.get("entries")
+    if entries is not None:
+        # Sliding window timestamps are packed as int64 milliseconds
+        data["entries"] = array("q", entries).tobytes()
+    return marshal.dumps(data)
+
+def decode_state(payload: bytes) -> Dict[str, Any]:
+    state = marshal.loads(payload)
+    entries = state.get("entries")
+    if entries is not None:
+        timestamps = array("q")
+        timestamps.frombytes(entries)
+        state["entries"] = deque(timestamps)
+    return state
+
+@functools.lru_cache(maxsize=256)
+def state_size(strategy: str, limit: int, window: int, precision: Optional[int] = None) -> int:
+    """
+    Upper bound in bytes of one key's encoded state, e.g. to size ``value_size``.
+    ``strategy`` is a check strategy, "gcra_schedule", "hierarchical_quota" or "block".
+    """
+    if strategy == "sliding_window":
+        # One int64 per request in the window
+        return len(encode_state({"entries": [], "expires_at": 0.0})) + 8 * limit
+    if strategy == "bucketed_window":
+        buckets, _ = algorithms.bucket_layout(window, precision)
+        # Distinct values, so that marshal cannot shorten repeats into references
+        slots = {LARGE + i: limit + i for i in range(buckets + 1)}
+        return len(encode_state({"slots": slots, "expires_at": 0.0}))
+    fields = STATE_FIELDS.get(strategy)
+    if fields is None:
+        raise ConfigurationError(f"Unsupported strategy: {strategy}")
+    state: Dict[str, Any] = {name: LARGE + i for i, name in enumerate(fields)}
+    state["expires_at"] = 0.0
+    return len(encode_state(state))
+
+def rule_state_size(rule: RateLimitRule) -> int:
+    strategy = "gcra_schedule" if rule.mode == "shape" else rule.strategy
+    return state_size(strategy, rule.requests, rule.window_seconds, rule.bucket_count)
+
+class SharedMemoryStorage(BaseStorage):
+    """
+    Fixed-size table shared by the processes that open the same ``path``, which should
+    be specific to the application: every process opening it shares its counters.
+    ``value_size`` bounds the encoded state of one key: sliding_window needs about
+    8 bytes per request in the window, the other strategies well under 100 bytes
+    (bucketed_window about 20 per bucket). Pass the ``rules`` the table will serve to
+    size it for them (``value_size`` then defaults to at least 1024) or to validate an
+    explicit ``value_size``; a rule that does not fit raises ConfigurationError. Other
+    rules that turn out too large raise StorageError per request, so the limiter's
+    fallback or fail_open policy applies. All processes must use the same ``slots``,
+    ``value_size`` and ``segments``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 16384,
+        value_size: Optional[int] = None,
+        segments: int = 64,
+        clock: Optional[Clock] = None,
+        backend: Optional[BaseStorage] = None,
+        rules: Optional[List[RateLimitRule]] = None
+    ):
+        if segments < 1 or slots < segments or slots % segments:
+            raise ConfigurationError("slots must be a positive multiple of segments")
+        needed = max((rule_state_size(rule) for rule in rules or []), default=0)
+        if value_size is None:
+            value_size = max(DEFAULT_VALUE_SIZE, needed)
+        elif value_size < needed:
+            raise ConfigurationError(
+                f"value_size={value_size} is too small for the given rules, which need {needed}"
+            )
+        self.path = path
+        self.slots = slots
+        self.value_size = value_size
+        self.segments = segments
+        self.segment_slots = slots // segments
+        self.slot_size = SLOT_HEADER.size + value_size
+        self.clock = clock or SYSTEM_CLOCK
+        self.backend = backend
+        self._thread_locks = [threading.Lock() for _ in range(segments)]
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            raise ConfigurationError(f"Cannot open shared memory table {self.path}: {e}") from e
+        try:
+            self._map = self._open_table()
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def _open_table(self) -> mmap.mmap:
+        size = HEADER_SIZE + self.slots * self.slot_size
+        # Whole-file lock so that only one process initialises the table
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, self.slots, self.value_size, self.segments), 0)
+            header = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if header != (MAGIC, self.slots, self.value_size, self.segments):
+                raise ConfigurationError(
+                    f"Shared memory table {self.path} has a different layout "
+                    f"(slots, value_size, segments = {header[1:]})"
+                )
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _locked(self, segments: List[int]) -> Iterator[None]:
+        # Sorted acquisition keeps multi-key operations deadlock free
+        ordered = sorted(set(segments))
+        acquired = []
+        try:
+            for segment in ordered:
+                self._thread_locks[segment].acquire()
+                acquired.append(segment)
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, HEADER_SIZE + segment)
+            yield
+        finally:
+            for segment in reversed(acquired):
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, HEADER_SIZE + segment)
+                self._thread_locks[segment].release()
+
+    def _locate(self, key: str) -> Tuple[bytes, int, int]:
+        """Return ``(digest, segment, home_slot)`` for a key."""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h = int.from_bytes(digest[:8], "little")
+        return digest, h % self.segments, (h // self.segments) % self.segment_slots
+
+    def _find(
+        self, segment: int, home: int, digest: bytes, now: float, taken: Set[int] = frozenset()
+    ) -> Tuple[int, int]:
+        """
+        Probe a segment for ``digest``. Returns ``(found, reusable)`` slot offsets, -1 when
+        missing. A key is always stored at or before the first never-used slot of its probe
+        sequence, so probing stops there. Slots in ``taken`` are about to be written by
+        other keys and count as occupied.
+        """
+        reusable = -1
+        base = segment * self.segment_slots
+        for i in range(self.segment_slots):
+            offset = HEADER_SIZE + (base + (home + i) % self.segment_slots) * self.slot_size
+            slot_digest, expires_at, _ = SLOT_HEADER.unpack_from(self._map, offset)
+            if slot_digest == digest:
+                return offset, offset
+            if offset in taken:
+                continue
+            if slot_digest == EMPTY_DIGEST:
+                return -1, offset if reusable < 0 else reusable
+            if reusable < 0 and now > expires_at:
+                reusable = offset
+        return -1, reusable
+
+    def _load(self, key: str, now: float) -> Dict[str, Any]:
+        digest, segment, home = self._locate(key)
+        found, _ = self._find(segment, home, digest, now)
+        if found < 0:
+            return {}
+        _, expires_at, length = SLOT_HEADER.unpack_from(self._map, found)
+        if now > expires_at:
+            return {}
+        start = found + SLOT_HEADER.size
+        return decode_state(self._map[start:start + length])
+
+    def _prepare(
+        self, key: str, state: Dict[str, Any], now: float, taken: Set[int]
+    ) -> Optional[Tuple[int, bytes, float, bytes]]:
+        """
+        Pick the slot and encode the state of a key. Returns ``(offset, digest, expires_at,
+        payload)``, or None when there is nothing to write.
+        """
+        digest, segment, home = self._locate(key)
+        found, reusable = self._find(segment, home, digest, now, taken)
+        if not state:
+            return (found, digest, RELEASED, b"") if found >= 0 else None
+        payload = encode_state(state)
+        if len(payload) > self.value_size:
+            raise StorageError(
+                f"State of {key} needs {len(payload)} bytes, more than value_size={self.value_size}"
+            )
+        offset = found if found >= 0 else reusable
+        if offset < 0:
+            raise StorageError(f"Shared memory table segment {segment} is full")
+        taken.add(offset)
+        return offset, digest, state.get("expires_at", NEVER_EXPIRES), payload
+
+    def _write(self, offset: int, digest: bytes, expires_at: float, payload: bytes) -> None:
+        SLOT_HEADER.pack_into(self._map, offset, digest, expires_at, len(payload))
+        start = offset + SLOT_HEADER.size
+        self._map[start:start + len(payload)] = payload
+
+    def _update(
+        self,
+        keys: List[str],
+        operation: Callable[[List[Dict[str, Any]], float], Any],
+        denied: Any
+    ) -> Any:
+        """
+        Run ``operation(states, now)`` on the keys' states under their segment locks.
+        When a state cannot be stored, nothing is written and ``denied`` is returned.
+        """
+        with self._locked([self._locate(key)[1] for key in keys]):
+            now = self.clock.time()
+            states = [self._load(key, now) for key in keys]
+            result = operation(states, now)
+            taken: Set[int] = set()
+            try:
+                writes = [self._prepare(key, state, now, taken) for key, state in zip(keys, states)]
+            except StorageError as e:
+                logger.error(f"Shared memory table {self.path} overflowed, denying request: {e}")
+                return denied
+            for write in writes:
+                if write is not None:
+                    self._write(*write)
+            return result
+
+    async def check_and_increment(
+        self,
+        key: str,
+        limit: int,
+        window: int,
+        strategy: str,
+        increment: int = 1,
+        **kwargs
+    ) -> Tuple[bool, int, int]:
+        algorithm = algorithms.STRATEGIES.get(strategy)
+        if algorithm is None:
+            raise StorageError(f"Unsupported strategy: {strategy}")
+        reserve = kwargs.get('reserve') or 0.0
+
+        if self.backend is not None:
+            # Denials depend on the reserved fraction, so they are cached per fraction
+            denial_key = f"{key}:deny:{reserve}"
+            blocked = self._blocked_for(denial_key)
+            if blocked > 0:
+                return False, 0, math.ceil(blocked)
+            allowed, remaining, retry_after = await self.backend.check_and_increment(
+                key, limit, window, strategy, increment, **kwargs
+            )
+            if not allowed and retry_after > 0:
+                self._block(denial_key, retry_after)
+            return allowed, remaining, retry_after
+
+        needed = state_size(strategy, limit, window, kwargs.get('precision'))
+        if needed > self.value_size:
+            raise StorageError(
+                f"{strategy} with limit {limit} needs value_size >= {needed}, "
+                f"the table at {self.path} has {self.value_size}"
+            )
+        return self._update([key], lambda states, now: algorithm(
+            states[0],
+            now,
+            limit,
+            window,
+            increment,
+            capacity=kwargs.get('capacity'),
+            precision=kwargs.get('precision'),
+            reserve=reserve
+        ), (False, 0, OVERFLOW_RETRY_AFTER))
+
+    async def check_hierarchy(
+        self,
+        keys: List[str],
+        levels: List[Tuple[int, int, bool]],
+        increment: int = 1,
+        **kwargs
+    ) -> Tuple[bool, int, int, int]:
+        if self.backend is not None:
+            return await self.backend.check_hierarchy(keys, levels, increment, **kwargs)
+        return self._update(
+            keys,
+            lambda states, now: algorithms.hierarchical_quota(states, now, levels, increment),
+            (False, 0, 0, OVERFLOW_RETRY_AFTER)
+        )
+
+    async def schedule(
+        self,
+        key: str,
+        limit: int,
+        window: int,
+        increment: int = 1,
+        max_wait: float = 0.0,
+        **kwargs
+    ) -> Tuple[bool, int, float]:
+        if self.backend is not None:
+            return await self.backend.schedule(key, limit, window, increment, max_wait, **kwargs)
+        allowed, remaining, wait = self._update([key], lambda states, now: algorithms.gcra_schedule(
+            states[0],
+            now,
+            limit,
+            window,
+            increment,
+            capacity=kwargs.get('capacity'),
+            max_wait=max_wait,
+            reserve=kwargs.get('reserve') or 0.0
+        ), (False, 0, OVERFLOW_RETRY_AFTER))
+        return allowed, remaining, wait / 1000 if allowed else wait
+
+    def _block(self, key: str, seconds: float) -> float:
+        # Without room to record it, the block is still reported to the caller
+        return self._update(
+            [key], lambda states, now: algorithms.block(states[0], now, seconds), seconds * 1000
+        ) / 1000
+
+    def _blocked_for(self, key: str) -> float:
+        _, segment, _ = self._locate(key)
+        with self._locked([segment]):
+            now = self.clock.time()
+            state = self._load(key, now)
+            return max(0, state.get("until", 0) - int(now * 1000)) / 1000
+
+    async def block(self, key: str, seconds: float, **kwargs) -> float:
+        if self.backend is not None:
+            remaining = await self.backend.block(key, seconds, **kwargs)
+            if remaining > 0:
+                self._block(key, remaining)
+            return remaining
+        return self._block(key, seconds)
+
+    async def blocked_for(self, key: str, **kwargs) -> float:
+        blocked = self._blocked_for(key)
+        if blocked > 0 or self.backend is None:
+            return blocked
+        return await self.backend.blocked_for(key, **kwargs)
+
+    async def close(self):
+        if not self._map.closed:
+            self._map.close()
+            os.close(self._fd)
+        if self.backend is not None:
+            await self.backend.close()
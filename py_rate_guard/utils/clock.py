@@ -0,0 +1,30 @@
+import time
+from abc import ABC, abstractmethod
+
+class Clock(ABC):
+    """Source of the current time (in seconds) used by storage backends."""
+
+    @abstractmethod
+    def time(self) -> float:
+        pass
+
+class SystemClock(Clock):
+    def time(self) -> float:
+        return time.time()
+
+class VirtualClock(Clock):
+    """A manually driven clock for simulations and deterministic tests."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def time(self) -> float:
+        return self._now
+
+    def set(self, now: float) -> None:
+        self._now = now
+
+    def advance(self, seconds: float) -> None:
+        self._now += seconds
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,22 @@
+from importlib import import_module
+from types import ModuleType
+from typing import Optional
+
+
+def require(module: str, extra: str) -> ModuleType:
+    """Import an optional dependency, pointing at the matching extra when it is missing."""
+    try:
+        return import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"'{module}' is required for this feature. "
+            f"Install it with: pip install 'py-rate-guard[{extra}]'"
+        ) from e
+
+
+def optional(module: str) -> Optional[ModuleType]:
+    """Import an optional dependency, returning None when it is not installed."""
+    try:
+        return import_module(module)
+    except ImportError:
+        return None
@@ -6,12 +6,14 @@
 # ARGV[2]: Window size (milliseconds)
 # ARGV[3]: Max requests allowed
 # ARGV[4]: Increment amount (usually 1)
+# ARGV[5]: Fraction of the limit reserved for higher priority classes
 SLIDING_WINDOW_SCRIPT = """
 local key = KEYS[1]
 local now = tonumber(ARGV[1])
 local window = tonumber(ARGV[2])
 local limit = tonumber(ARGV[3])
 local increment = tonumber(ARGV[4])
+local available = limit - math.floor(limit * tonumber(ARGV[5] or 0))
 
 local window_start = now - window
 
@@ -21,13 +23,13 @@ redis.call('ZREMRANGEBYSCORE', key, 0, window_start)
 -- Count current entries
 local current_count = redis.call('ZCARD', key)
 
-if current_count + increment <= limit then
+if current_count + increment <= available then
     -- Add new entry for each increment
     for i=1,increment do
         redis.call('ZADD', key, now, now .. '-' .. i .. '-' .. math.random())
     end
     redis.call('PEXPIRE', key, window)
-    return {1, limit - (current_count + increment), 0}
+    return {1, available - (current_count + increment), 0}
 else
     -- Get earliest entry to calculate retry_after
     local earliest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
@@ -45,12 +47,14 @@ end
 # ARGV[2]: Fill rate (tokens/second)
 # ARGV[3]: Capacity
 # ARGV[4]: Increment amount
+# ARGV[5]: Fraction of the capacity reserved for higher priority classes
 TOKEN_BUCKET_SCRIPT = """
 local key = KEYS[1]
 local now = tonumber(ARGV[1])
 local fill_rate = tonumber(ARGV[2])
 local capacity = tonumber(ARGV[3])
 local increment = tonumber(ARGV[4])
+local reserved = math.floor(capacity * tonumber(ARGV[5] or 0))
 
 local bucket = redis.call('HMGET', key, 'tokens', 'last_refill')
 local tokens = tonumber(bucket[1]) or capacity
@@ -61,16 +65,16 @@ local delta = math.max(0, now - last_refill)
 tokens = math.min(capacity, tokens + (delta * fill_rate))
 
 local allowed = 0
-local remaining = tokens
+local remaining = math.max(0, tokens - reserved)
 local retry_after = 0
 
-if tokens >= increment then
+if tokens - reserved >= increment then
     tokens = tokens - increment
     allowed = 1
-    remaining = tokens
+    remaining = tokens - reserved
 else
     -- Calculate when enough tokens will be available
-    retry_after = math.ceil((increment - tokens) / fill_rate)
+    retry_after = math.ceil((increment + reserved - tokens) / fill_rate)
 end
 
 redis.call('HMSET', key, 'tokens', tokens, 'last_refill', now)
@@ -84,22 +88,28 @@ return {allowed, math.floor(remaining), retry_after}
 # ARGV[1]: Window size (seconds)
 # ARGV[2]: Limit
 # ARGV[3]: Increment
+# ARGV[4]: Fraction of the limit reserved for higher priority classes
 FIXED_WINDOW_SCRIPT = """
 local key = KEYS[1]
 local window = tonumber(ARGV[1])
 local limit = tonumber(ARGV[2])
 local increment = tonumber(ARGV[3])
+local reserved = math.floor(limit * tonumber(ARGV[4] or 0))
+local available = limit - reserved
 
 local current = redis.call('GET', key)
-if current and tonumber(current) + increment > limit then
+if (current or reserved > 0) and (tonumber(current) or 0) + increment > available then
     local ttl = redis.call('TTL', key)
+    if ttl < 0 then
+        ttl = window
+    end
     return {0, 0, ttl}
 else
     local new_val = redis.call('INCRBY', key, increment)
     if new_val == increment then
         redis.call('EXPIRE', key, window)
     end
-    return {1, limit - new_val, 0}
+    return {1, available - new_val, 0}
 end
 """
 
@@ -109,12 +119,14 @@ end
 # ARGV[2]: Leak rate (requests/second)
 # ARGV[3]: Capacity
 # ARGV[4]: Increment
+# ARGV[5]: Fraction of the capacity reserved for higher priority classes
 LEAKY_BUCKET_SCRIPT = """
 local key = KEYS[1]
 local now = tonumber(ARGV[1])
 local leak_rate = tonumber(ARGV[2])
 local capacity = tonumber(ARGV[3])
 local increment = tonumber(ARGV[4])
+local available = capacity - math.floor(capacity * tonumber(ARGV[5] or 0))
 
 local bucket = redis.call('HMGET', key, 'level', 'last_leak')
 local level = tonumber(bucket[1]) or 0
@@ -125,16 +137,16 @@ local delta = math.max(0, now - last_leak)
 level = math.max(0, level - (delta * leak_rate))
 
 local allowed = 0
-local remaining = capacity - level
+local remaining = math.max(0, available - level)
 local retry_after = 0
 
-if level + increment <= capacity then
+if level + increment <= available then
     level = level + increment
     allowed = 1
-    remaining = capacity - level
+    remaining = available - level
 else
     -- Calculate when there will be space
-    retry_after = math.ceil((level + increment - capacity) / leak_rate)
+    retry_after = math.ceil((level + increment - available) / leak_rate)
 end
 
 redis.call('HMSET', key, 'level', level, 'last_leak', now)
@@ -142,3 +154,174 @@ redis.call('EXPIRE', key, math.ceil(capacity / leak_rate) + 10)
 
 return {allowed, math.floor(remaining), retry_after}
 """
+
+# Bucketed Sliding Window Algorithm
+# The window is split into fixed sub-buckets stored as fields of a single hash
+# (slot number -> count). The current slot plus the previous `buckets` slots are
+# counted, so any interval of one window length is always covered: the limit is a
+# hard guarantee, at the cost of up to one bucket of extra history.
+# Memory is O(buckets) per key and independent of the limit.
+# KEYS[1]: Key
+# ARGV[1]: Current timestamp (milliseconds)
+# ARGV[2]: Bucket size (milliseconds)
+# ARGV[3]: Number of buckets per window
+# ARGV[4]: Max requests allowed
+# ARGV[5]: Increment amount
+# ARGV[6]: Fraction of the limit reserved for higher priority classes
+BUCKETED_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local bucket_ms = tonumber(ARGV[2])
+local buckets = tonumber(ARGV[3])
+local limit = tonumber(ARGV[4])
+local increment = tonumber(ARGV[5])
+local available = limit - math.floor(limit * tonumber(ARGV[6] or 0))
+
+local current_slot = math.floor(now / bucket_ms)
+local oldest_slot = current_slot - buckets
+
+-- Sum live buckets and prune expired ones
+local fields = redis.call('HGETALL', key)
+local total = 0
+local live = {}
+local expired = {}
+for i = 1, #fields, 2 do
+    local slot = tonumber(fields[i])
+    local count = tonumber(fields[i + 1])
+    if slot < oldest_slot then
+        table.insert(expired, fields[i])
+    else
+        total = total + count
+        table.insert(live, {slot, count})
+    end
+end
+if #expired > 0 then
+    redis.call('HDEL', key, unpack(expired))
+end
+
+if total + increment <= available then
+    redis.call('HINCRBY', key, current_slot, increment)
+    redis.call('PEXPIRE', key, (buckets + 1) * bucket_ms)
+    return {1, available - (total + increment), 0}
+end
+
+-- Find the first bucket whose expiry frees enough capacity
+table.sort(live, function(a, b) return a[1] < b[1] end)
+local needed = total + increment - available
+local retry_after = 0
+for _, bucket in ipairs(live) do
+    needed = needed - bucket[2]
+    if needed <= 0 then
+        retry_after = math.max(0, math.ceil(((bucket[1] + buckets + 1) * bucket_ms - now) / 1000))
+        break
+    end
+end
+return {0, 0, retry_after}
+"""
+
+# Hierarchical Quota Algorithm
+# Fixed-window counters for nested budgets (e.g. org -> user -> API key), checked and
+# charged together. A level with borrow=1 may exceed its own limit as long as its
+# ancestors admit the request; the root level is always enforced.
+# All keys must hash to the same cluster slot.
+# KEYS[1..n]: Level keys, ordered from root to leaf
+# ARGV[1]: Increment amount
+# ARGV[2 + 3 * (i - 1)]: Limit of level i
+# ARGV[3 + 3 * (i - 1)]: Window of level i (seconds)
+# ARGV[4 + 3 * (i - 1)]: Borrow flag of level i (0 or 1)
+# Returns: {allowed, violated_level (1-based, 0 if none), remaining, retry_after}
+HIERARCHICAL_QUOTA_SCRIPT = """
+local increment = tonumber(ARGV[1])
+local levels = #KEYS
+
+local violated = 0
+local retry_after = 0
+for i = 1, levels do
+    local base = 3 * (i - 1)
+    local limit = tonumber(ARGV[base + 2])
+    local borrow = tonumber(ARGV[base + 4])
+    local current = tonumber(redis.call('GET', KEYS[i]) or 0)
+    if current + increment > limit and (borrow == 0 or i == 1) then
+        local ttl = redis.call('TTL', KEYS[i])
+        if violated == 0 or ttl > retry_after then
+            violated = i
+            retry_after = ttl
+        end
+    end
+end
+
+if violated > 0 then
+    return {0, violated, 0, math.max(0, retry_after)}
+end
+
+local remaining = -1
+for i = 1, levels do
+    local base = 3 * (i - 1)
+    local limit = tonumber(ARGV[base + 2])
+    local window = tonumber(ARGV[base + 3])
+    local new_val = redis.call('INCRBY', KEYS[i], increment)
+    if new_val == increment then
+        redis.call('EXPIRE', KEYS[i], window)
+    end
+    local left = math.max(0, limit - new_val)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+end
+return {1, 0, remaining, 0}
+"""
+
+# GCRA Scheduler (traffic shaping)
+# Reserves the next free emission slot instead of rejecting: the caller waits `wait`
+# milliseconds before proceeding. Requests whose wait would exceed max_wait are denied
+# and nothing is reserved. The key stores the theoretical arrival time (TAT).
+# KEYS[1]: Key
+# ARGV[1]: Current timestamp (milliseconds)
+# ARGV[2]: Emission interval (milliseconds per request)
+# ARGV[3]: Burst size (requests admitted without waiting)
+# ARGV[4]: Increment amount
+# ARGV[5]: Max wait (milliseconds)
+# ARGV[6]: Fraction of the burst reserved for higher priority classes
+# Returns: {allowed, remaining, wait_ms if allowed else retry_after (seconds)}
+GCRA_SCHEDULE_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local increment = tonumber(ARGV[4])
+local max_wait = tonumber(ARGV[5])
+local available = burst - math.floor(burst * tonumber(ARGV[6] or 0))
+
+local tat = math.max(tonumber(redis.call('GET', key) or now), now)
+local new_tat = tat + interval * increment
+local wait = math.max(0, new_tat - now - interval * available)
+
+if wait > max_wait then
+    return {0, 0, math.ceil((wait - max_wait) / 1000)}
+end
+
+redis.call('SET', key, new_tat, 'PX', math.ceil(new_tat - now))
+local remaining = math.max(0, math.floor((interval * available - (new_tat - now)) / interval))
+return {1, remaining, math.ceil(wait)}
+"""
+
+# Block (shared back-off)
+# Pauses every caller of a key until `now + duration`, e.g. after a vendor's Retry-After.
+# An existing block that lasts longer is kept. The key stores the unblock time.
+# KEYS[1]: Key
+# ARGV[1]: Current timestamp (milliseconds)
+# ARGV[2]: Block duration (milliseconds)
+# Returns: remaining block (milliseconds)
+BLOCK_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local duration = tonumber(ARGV[2])
+
+local blocked_until = tonumber(redis.call('GET', key) or 0)
+local new_until = now + duration
+if new_until > blocked_until then
+    redis.call('SET', key, new_until, 'PX', duration)
+    blocked_until = new_until
+end
+return blocked_until - now
+"""
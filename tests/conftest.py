@@ -0,0 +1,37 @@
+import pytest
+from fakeredis.aioredis import FakeRedis
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.models.config import RateGuardConfig, RedisConfig
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.storage.redis import RedisStorage
+
+def fake_redis_storage(clock=None) -> RedisStorage:
+    """RedisStorage on an in-process FakeRedis with every script registered."""
+    storage = RedisStorage(RedisConfig(), clock=clock)
+    storage.client = FakeRedis(decode_responses=True)
+    storage.register_scripts()
+    return storage
+
+class CountingStorage(MemoryStorage):
+    """MemoryStorage that counts check_and_increment calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def check_and_increment(self, *args, **kwargs):
+        self.calls += 1
+        return await super().check_and_increment(*args, **kwargs)
+
+@pytest.fixture
+def make_redis_storage():
+    return fake_redis_storage
+
+@pytest.fixture
+def counting_storage():
+    return CountingStorage()
+
+@pytest.fixture(params=["redis", "memory"])
+def limiter(request):
+    storage = fake_redis_storage() if request.param == "redis" else MemoryStorage()
+    return RateLimiter(RateGuardConfig(), storage=storage)
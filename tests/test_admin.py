@@ -0,0 +1,99 @@
+import pytest
+from py_rate_guard.admin.keyspace import KeyInfo, KeyspaceAdmin, KeyspaceReport, classify_key, main
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.models.config import (
+    HierarchicalQuota, QuotaLevel, RateGuardConfig, RateLimitRule
+)
+
+@pytest.fixture
+async def populated(make_redis_storage):
+    storage = make_redis_storage()
+    limiter = RateLimiter(RateGuardConfig(), storage=storage)
+
+    per_minute = RateLimitRule(limit="10/minute")
+    per_hour = RateLimitRule(limit="100/hour", strategy="fixed_window", key_prefix="api")
+    for tenant in range(5):
+        await limiter.check(f"tenant-{tenant}", [per_minute, per_hour])
+    quota = HierarchicalQuota(levels=[QuotaLevel(name="org", limit="5/minute"), QuotaLevel(name="user", limit="2/minute")])
+    await limiter.check_hierarchy(["acme", "alice"], quota)
+    await storage.client.set("unrelated", "1")
+    return storage.client
+
+def test_classify_key():
+    assert classify_key("rl:tenant-1:10/minute") == ("rl", "10/minute")
+    assert classify_key("rl:user:a:b:100/hour") == ("rl", "100/hour")
+    assert classify_key("rlq:{acme}:user:acme:alice") == ("rlq", "user")
+    assert classify_key("rlb:api.vendor.test") == ("rlb", "")
+    assert classify_key("unrelated") == ("", "")
+
+@pytest.mark.asyncio
+async def test_stats_aggregate_per_prefix_and_rule(populated):
+    admin = KeyspaceAdmin(client=populated)
+    report = await admin.stats(count=3)
+    data = report.as_dict()
+
+    assert data["total"]["keys"] == 13
+    assert data["prefixes"]["rl"]["types"] == {"zset": 5}
+    assert data["prefixes"]["api"]["types"] == {"string": 5}
+    rules = {(row["prefix"], row["rule"]): row["keys"] for row in data["rules"]}
+    assert rules[("rl", "10/minute")] == 5
+    assert rules[("api", "100/hour")] == 5
+    assert rules[("rlq", "org")] == 1 and rules[("rlq", "user")] == 1
+    # Only the unrelated key lacks a TTL
+    assert data["total"]["no_ttl"] == 1
+
+    rl_only = await admin.stats(match="rl:*")
+    assert rl_only.total.keys == 5
+
+def test_report_tracks_memory_and_largest_keys():
+    report = KeyspaceReport(top=2)
+    for i, memory in enumerate([100, 5000, None, 300]):
+        report.add(KeyInfo(f"rl:k{i}:10/minute", "zset", 60, memory))
+
+    data = report.as_dict()
+    assert data["total"]["memory_bytes"] == 5400
+    assert data["total"]["memory_unknown"] == 1
+    assert [info["memory"] for info in data["largest"]] == [5000, 300]
+
+@pytest.mark.asyncio
+async def test_reset_by_pattern_and_keys(populated):
+    admin = KeyspaceAdmin(client=populated, prefixes=["rl", "api"])
+
+    assert await admin.reset(pattern="rl:tenant-1:*", count=2) == 1
+    assert await populated.exists("rl:tenant-1:10/minute") == 0
+    assert await populated.exists("api:tenant-1:100/hour") == 1
+
+    deleted = await admin.reset(keys=["api:tenant-1:100/hour", "api:tenant-2:100/hour", "api:missing"], batch=2)
+    assert deleted == 2
+    assert (await admin.stats()).total.keys == 10
+
+    with pytest.raises(ValueError):
+        await admin.reset()
+
+@pytest.mark.asyncio
+async def test_reset_stays_under_rate_limiter_prefixes(populated):
+    admin = KeyspaceAdmin(client=populated)
+
+    for pattern in ("*", "rl*", "rl*:*", "unrelated", "api:*"):
+        with pytest.raises(ValueError):
+            await admin.reset(pattern=pattern)
+    with pytest.raises(ValueError):
+        await admin.reset(keys=["rl:tenant-1:10/minute", "unrelated"])
+
+    assert await admin.reset(pattern="rl:*", dry_run=True) == 5
+    assert await admin.reset(keys=["rl:tenant-1:10/minute", "rl:missing"], dry_run=True) == 1
+    assert (await admin.stats()).total.keys == 13
+
+    assert await admin.reset(pattern="rlq:*") == 2
+    # Keys outside the rate limiter's prefixes survive
+    assert await populated.get("unrelated") == "1"
+    assert (await admin.stats(match="api:*")).total.keys == 5
+
+def test_cli_requires_a_reset_target():
+    with pytest.raises(SystemExit):
+        main(["reset", "--yes"])
+    # Deleting needs --yes (or a --dry-run preview)
+    with pytest.raises(SystemExit):
+        main(["reset", "--pattern", "rl:*"])
+    with pytest.raises(SystemExit):
+        main(["reset", "--pattern", "*", "--yes"])
@@ -0,0 +1,44 @@
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(RATE_GUARD={"global_rules": [{"limit": "2/minute", "reserved": {3: 0.5}}]})
+
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from py_rate_guard.adapters.django import DjangoRateGuardMiddleware
+from py_rate_guard.models.config import Priority
+from py_rate_guard.resolvers.priority import (
+    HeaderPriorityResolver, PathPriorityResolver, StaticPriorityResolver
+)
+from py_rate_guard.storage.memory import MemoryStorage
+
+def middleware(cls=DjangoRateGuardMiddleware):
+    guard = cls(lambda request: HttpResponse("ok"))
+    guard.limiter.storage = MemoryStorage()
+    return guard
+
+def statuses(guard, path, count, **headers):
+    factory = RequestFactory()
+    return [guard(factory.get(path, **headers)).status_code for _ in range(count)]
+
+def test_priority_resolver_from_settings():
+    resolver = PathPriorityResolver({"/health": Priority.CRITICAL})
+    with override_settings(RATE_GUARD_PRIORITY_RESOLVER=resolver):
+        guard = middleware()
+    assert guard.priority_resolver is resolver
+
+    # NORMAL requests may only use the unreserved half of the limit
+    assert statuses(guard, "/api", 2) == [200, 429]
+    assert statuses(guard, "/health", 2) == [200, 429]
+
+    path = "py_rate_guard.resolvers.priority.StaticPriorityResolver"
+    with override_settings(RATE_GUARD_PRIORITY_RESOLVER=path):
+        assert isinstance(middleware().priority_resolver, StaticPriorityResolver)
+
+def test_priority_resolver_as_subclass_attribute():
+    class HeaderPriorityMiddleware(DjangoRateGuardMiddleware):
+        priority_resolver = HeaderPriorityResolver("X-Priority")
+
+    guard = middleware(HeaderPriorityMiddleware)
+    assert statuses(guard, "/api", 2) == [200, 429]
+    assert statuses(guard, "/api", 2, HTTP_X_PRIORITY="critical") == [200, 429]
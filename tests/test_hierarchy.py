@@ -0,0 +1,87 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from py_rate_guard.adapters.fastapi import FastAPIRateGuard
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.exceptions import ConfigurationError
+from py_rate_guard.models.config import HierarchicalQuota, QuotaLevel, RateGuardConfig
+from py_rate_guard.resolvers.default import HeaderResolver
+from py_rate_guard.storage.memory import MemoryStorage
+
+def org_user_quota(borrow: bool = False) -> HierarchicalQuota:
+    return HierarchicalQuota(levels=[
+        QuotaLevel(name="org", limit="3/minute"),
+        QuotaLevel(name="user", limit="2/minute", borrow=borrow),
+    ])
+
+@pytest.mark.asyncio
+async def test_every_level_is_enforced(limiter):
+    quota = org_user_quota()
+
+    assert (await limiter.check_hierarchy(["acme", "alice"], quota))[0] is True
+    assert (await limiter.check_hierarchy(["acme", "alice"], quota))[0] is True
+
+    allowed, level, retry_after = await limiter.check_hierarchy(["acme", "alice"], quota)
+    assert allowed is False
+    assert level.name == "user"
+    assert 0 < retry_after <= 60
+
+    # Bob has his own user budget but shares the org pool
+    assert (await limiter.check_hierarchy(["acme", "bob"], quota))[0] is True
+    allowed, level, _ = await limiter.check_hierarchy(["acme", "bob"], quota)
+    assert allowed is False
+    assert level.name == "org"
+
+@pytest.mark.asyncio
+async def test_child_borrows_idle_parent_capacity(limiter):
+    quota = org_user_quota(borrow=True)
+
+    for _ in range(3):
+        assert (await limiter.check_hierarchy(["acme", "alice"], quota))[0] is True
+
+    allowed, level, _ = await limiter.check_hierarchy(["acme", "alice"], quota)
+    assert allowed is False
+    assert level.name == "org"
+
+@pytest.mark.asyncio
+async def test_denied_request_charges_no_level(limiter):
+    quota = org_user_quota()
+
+    assert (await limiter.check_hierarchy(["acme", "alice"], quota, cost=2))[0] is True
+    assert (await limiter.check_hierarchy(["acme", "alice"], quota, cost=1))[0] is False
+    # The denied request did not consume the org budget
+    assert (await limiter.check_hierarchy(["acme", "bob"], quota, cost=1))[0] is True
+
+@pytest.mark.asyncio
+async def test_level_keys_share_a_cluster_slot(make_redis_storage):
+    storage = make_redis_storage()
+    limiter = RateLimiter(RateGuardConfig(), storage=storage)
+
+    await limiter.check_hierarchy(["acme", "alice"], org_user_quota())
+
+    keys = sorted(await storage.client.keys("*"))
+    assert keys == ["rlq:{acme}:org:acme", "rlq:{acme}:user:acme:alice"]
+
+@pytest.mark.asyncio
+async def test_key_count_must_match_levels():
+    limiter = RateLimiter(RateGuardConfig(), storage=MemoryStorage())
+    with pytest.raises(ConfigurationError):
+        await limiter.check_hierarchy(["acme"], org_user_quota())
+
+def test_fastapi_quota_decorator():
+    app = FastAPI()
+    guard = FastAPIRateGuard(RateGuardConfig())
+    guard.limiter.storage = MemoryStorage()
+
+    @app.get("/")
+    @guard.quota(org_user_quota(), [HeaderResolver("X-Org"), HeaderResolver("X-User")])
+    async def root(request: Request):
+        return {"ok": True}
+
+    client = TestClient(app)
+    headers = {"X-Org": "acme", "X-User": "alice"}
+    assert client.get("/", headers=headers).status_code == 200
+    assert client.get("/", headers=headers).status_code == 200
+    response = client.get("/", headers=headers)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["redis", "prometheus_client", "pydantic", "fastapi", "starlette", "django"]
+
+
+def _loaded_after(statement: str) -> set:
+    code = (
+        f"import sys; {statement}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return {m for m in out.stdout.strip().split(",") if m}
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import py_rate_guard",
+        "from py_rate_guard.storage.memory import MemoryStorage",
+    ],
+)
+def test_lightweight_imports_do_not_load_optional_dependencies(statement):
+    assert _loaded_after(statement) == set()
+
+
+def test_engine_does_not_load_redis_or_prometheus():
+    loaded = _loaded_after("from py_rate_guard import RateLimiter")
+    assert "redis" not in loaded
+    assert "prometheus_client" not in loaded
+
+
+def test_lazy_public_names_resolve():
+    import py_rate_guard
+    from py_rate_guard.core.engine import RateLimiter
+
+    assert py_rate_guard.RateLimiter is RateLimiter
+    assert "RateLimitRule" in dir(py_rate_guard)
+    with pytest.raises(AttributeError):
+        py_rate_guard.DoesNotExist
@@ -0,0 +1,128 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from prometheus_client import REGISTRY
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.exceptions import StorageError
+from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
+from py_rate_guard.observability.instrumentation import Instrumentation, NOOP_STAGE
+from py_rate_guard.storage.base import BaseStorage
+from py_rate_guard.storage.memory import MemoryStorage
+
+class FailingStorage(BaseStorage):
+    async def check_and_increment(self, key, limit, window, strategy, increment=1, **kwargs):
+        raise StorageError("down")
+
+    async def close(self):
+        pass
+
+def test_disabled_instrumentation_is_noop():
+    instrumentation = Instrumentation()
+    assert instrumentation.stage("storage", rule="1/second") is NOOP_STAGE
+
+@pytest.mark.asyncio
+async def test_stage_hooks_receive_timings():
+    limiter = RateLimiter(RateGuardConfig(instrumentation=True), storage=MemoryStorage())
+    events = []
+    limiter.instrumentation.add_hook(lambda stage, duration, attrs: events.append((stage, duration, attrs)))
+
+    allowed, _, _ = await limiter.check("user", [RateLimitRule(limit="5/minute")])
+
+    assert allowed is True
+    assert [stage for stage, _, _ in events] == ["rule_lookup", "storage", "report"]
+    assert all(duration >= 0 for _, duration, _ in events)
+    assert events[1][2]["rule"] == "5/minute"
+    assert events[1][2]["strategy"] == "sliding_window"
+
+@pytest.mark.asyncio
+async def test_fallback_stage_is_recorded():
+    config = RateGuardConfig(instrumentation=True, in_memory_fallback=True)
+    limiter = RateLimiter(config, storage=FailingStorage())
+    stages = []
+    limiter.instrumentation.add_hook(lambda stage, duration, attrs: stages.append(stage))
+
+    allowed, _, _ = await limiter.check("user", [RateLimitRule(limit="5/minute")])
+
+    assert allowed is True
+    assert stages == ["rule_lookup", "storage", "fallback", "report"]
+
+@pytest.mark.asyncio
+async def test_redis_storage_reports_noscript_reloads(make_redis_storage):
+    storage = make_redis_storage()
+    limiter = RateLimiter(RateGuardConfig(instrumentation=True), storage=storage)
+    storage_attrs = []
+    limiter.instrumentation.add_hook(
+        lambda stage, duration, attrs: storage_attrs.append(dict(attrs)) if stage == "storage" else None
+    )
+    rules = [RateLimitRule(limit="5/minute")]
+
+    await limiter.check("user", rules)
+    await limiter.check("user", rules)
+
+    assert storage_attrs[0]["noscript_reloads"] == 1
+    assert storage_attrs[1]["noscript_reloads"] == 0
+    assert storage_attrs[1]["retries"] == 0
+
+@pytest.mark.asyncio
+async def test_redis_storage_retries_only_before_the_script_was_sent(make_redis_storage, monkeypatch):
+    storage = make_redis_storage()
+    storage.config.max_retries = 2
+    pool = storage.client.connection_pool
+    get_connection, evalsha = pool.get_connection, Redis.evalsha
+    connect_failures, reply_failures = [], []
+
+    async def flaky_get_connection(*args, **kwargs):
+        if connect_failures:
+            raise connect_failures.pop(0)
+        return await get_connection(*args, **kwargs)
+
+    async def flaky_evalsha(self, *args):
+        result = await evalsha(self, *args)
+        if reply_failures:
+            raise reply_failures.pop(0)  # The script ran, but the reply was lost
+        return result
+
+    monkeypatch.setattr(pool, "get_connection", flaky_get_connection)
+    monkeypatch.setattr(Redis, "evalsha", flaky_evalsha)
+    retried = lambda script: REGISTRY.get_sample_value(
+        "rate_guard_redis_retries_total", {"script": script}
+    ) or 0
+    before = retried("fixed_window")
+    stage = Instrumentation(enabled=True).stage("storage")
+
+    # Only the exception type matters, not redis-py's wording
+    connect_failures.append(RedisConnectionError("refused"))
+    assert await storage.check_and_increment("k", 5, 60, "fixed_window", stage=stage) == (True, 4, 0)
+    assert stage.attributes["retries"] == 1
+    assert retried("fixed_window") == before + 1
+
+    reply_failures.append(RedisTimeoutError("timed out"))
+    with pytest.raises(StorageError):
+        await storage.check_and_increment("k", 5, 60, "fixed_window")
+    # Charged once by the timed-out call, not again by a retry
+    assert await storage.client.get("k") == "2"
+
+    # Blocking twice is harmless, so a lost reply is retried
+    reply_failures.append(RedisConnectionError("reset"))
+    assert await storage.block("vendor", 5) == 5.0
+
+@pytest.mark.asyncio
+async def test_opentelemetry_spans_carry_stage_attributes(make_redis_storage, monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(trace, "get_tracer", provider.get_tracer)
+    limiter = RateLimiter(RateGuardConfig(opentelemetry=True), storage=make_redis_storage())
+
+    await limiter.check("user", [RateLimitRule(limit="5/minute")])
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {"rate_guard.rule_lookup", "rate_guard.storage", "rate_guard.report"}
+    storage_span = spans["rate_guard.storage"]
+    assert storage_span.attributes["strategy"] == "sliding_window"
+    assert storage_span.attributes["noscript_reloads"] == 1
+    assert storage_span.attributes["retries"] == 0
@@ -0,0 +1,119 @@
+import time
+import httpx
+import pytest
+from py_rate_guard.adapters.httpx import RateLimitedTransport
+from py_rate_guard.core.outbound import OutboundLimiter, parse_reset, parse_retry_after
+from py_rate_guard.exceptions import RateLimitExceeded
+from py_rate_guard.models.config import RateLimitRule
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
+
+def vendor(responses):
+    """Mock upstream returning the queued (status, headers) pairs, then 200s."""
+    calls = []
+
+    def handler(request):
+        calls.append(time.perf_counter())
+        status, headers = responses.pop(0) if responses else (200, {})
+        return httpx.Response(status, headers=headers)
+
+    return httpx.MockTransport(handler), calls
+
+def test_header_parsing():
+    now = 1_700_000_000.0
+    assert parse_retry_after("3", now) == 3.0
+    assert parse_retry_after("Tue, 14 Nov 2023 22:13:30 GMT", now) == 10.0
+    assert parse_retry_after("soon", now) is None
+    assert parse_reset("20", now) == 20.0
+    assert parse_reset(str(now + 30), now) == 30.0
+
+@pytest.mark.asyncio
+async def test_transport_waits_for_a_slot(limiter):
+    rule = RateLimitRule(limit="10/second", mode="shape", max_wait=1.0)
+    inner, calls = vendor([])
+    transport = RateLimitedTransport(OutboundLimiter(limiter, rule), transport=inner)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        start = time.perf_counter()
+        for _ in range(12):
+            assert (await client.get("https://api.vendor.test/items")).status_code == 200
+
+    assert len(calls) == 12
+    # The burst of 10 goes out at once, the last two wait for 100ms slots
+    assert calls[-1] - start >= 0.15
+
+@pytest.mark.asyncio
+async def test_retry_after_blocks_every_client(limiter):
+    rule = RateLimitRule(limit="100/second")
+    inner, calls = vendor([(429, {"Retry-After": "1"})])
+    first = httpx.AsyncClient(transport=RateLimitedTransport(OutboundLimiter(limiter, rule), transport=inner))
+    # A second process sharing the same storage, with a bounded wait
+    outbound = OutboundLimiter(limiter, rule, max_wait=0.2)
+    second = httpx.AsyncClient(transport=RateLimitedTransport(outbound, transport=inner))
+
+    assert (await first.get("https://api.vendor.test/")).status_code == 429
+    assert 0 < await limiter.blocked_for("rlb:api.vendor.test") <= 1.0
+    with pytest.raises(RateLimitExceeded):
+        await second.get("https://api.vendor.test/")
+    assert len(calls) == 1
+
+    # Other hosts are unaffected
+    assert (await second.get("https://other.vendor.test/")).status_code == 200
+    await first.aclose()
+    await second.aclose()
+
+@pytest.mark.asyncio
+async def test_exhausted_remaining_blocks_until_reset(limiter):
+    outbound = OutboundLimiter(limiter, RateLimitRule(limit="100/second"))
+
+    assert await outbound.update("vendor", 200, {"X-RateLimit-Remaining": "5000", "X-RateLimit-Reset": "30"}) == 0
+    blocked = await outbound.update("vendor", 200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"})
+    assert 29 < blocked <= 30
+    # A shorter pause does not cut an existing block short
+    assert 29 < await outbound.update("vendor", 429, {"Retry-After": "2"}) <= 30
+
+def test_advertised_budget_paces_callers():
+    outbound = OutboundLimiter(None, RateLimitRule(limit="50/second"))
+    headers = lambda remaining, reset: {"X-RateLimit-Remaining": remaining, "X-RateLimit-Reset": reset}
+
+    # 10 calls left for 60 seconds: one call every 6 seconds
+    assert outbound.backoff_from(200, headers("10", "60")) == 6.0
+    # The rule (one call every 20ms) is already slower than the vendor's budget
+    assert outbound.backoff_from(200, headers("5000", "60")) is None
+    assert outbound.backoff_from(200, headers("n/a", "60")) is None
+
+@pytest.mark.asyncio
+async def test_block_matches_between_backends(make_redis_storage):
+    clock = VirtualClock(1_000.0)
+    backends = [make_redis_storage(clock), MemoryStorage(clock)]
+
+    for storage in backends:
+        assert await storage.blocked_for("vendor") == 0
+        assert await storage.block("vendor", 5) == 5
+        assert await storage.block("vendor", 2) == 5
+    clock.advance(1.5)
+    for storage in backends:
+        assert await storage.blocked_for("vendor") == 3.5
+        assert await storage.block("vendor", 4) == 4
+
+@pytest.mark.asyncio
+async def test_aiohttp_trace_config(limiter):
+    aiohttp = pytest.importorskip("aiohttp")
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from py_rate_guard.adapters.aiohttp import rate_limit_trace_config
+
+    async def handler(request):
+        return web.Response(status=429, headers={"Retry-After": "5"})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    outbound = OutboundLimiter(limiter, RateLimitRule(limit="100/second"), max_wait=0.1)
+
+    async with TestServer(app) as server:
+        trace_configs = [rate_limit_trace_config(outbound)]
+        async with aiohttp.ClientSession(trace_configs=trace_configs) as session:
+            async with session.get(server.make_url("/")) as response:
+                assert response.status == 429
+            with pytest.raises(RateLimitExceeded):
+                await session.get(server.make_url("/"))
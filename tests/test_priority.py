@@ -0,0 +1,70 @@
+import pytest
+from pydantic import ValidationError
+from py_rate_guard.models.config import Priority, RateLimitRule
+from py_rate_guard.resolvers.priority import HeaderPriorityResolver, PathPriorityResolver
+
+STRATEGIES = ["sliding_window", "token_bucket", "fixed_window", "leaky_bucket", "bucketed_window"]
+
+async def admitted(limiter, rule, priority, attempts=20):
+    count = 0
+    for _ in range(attempts):
+        allowed, _, _ = await limiter.check("client", [rule], priority)
+        count += allowed
+    return count
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", STRATEGIES)
+async def test_low_priority_traffic_is_shed_first(limiter, strategy):
+    rule = RateLimitRule(
+        limit="10/minute",
+        strategy=strategy,
+        reserved={Priority.CRITICAL: 0.2, Priority.HIGH: 0.3},
+    )
+
+    assert await admitted(limiter, rule, Priority.BACKGROUND) == 5
+    assert await admitted(limiter, rule, Priority.NORMAL) == 0
+    assert await admitted(limiter, rule, Priority.HIGH) == 3
+    assert await admitted(limiter, rule, Priority.CRITICAL) == 2
+
+@pytest.mark.asyncio
+async def test_denied_low_priority_request_reports_retry_after(limiter):
+    rule = RateLimitRule(limit="2/minute", reserved={Priority.CRITICAL: 0.5})
+
+    assert (await limiter.check("client", [rule], Priority.NORMAL))[0] is True
+    allowed, violated, retry_after = await limiter.check("client", [rule], Priority.NORMAL)
+    assert allowed is False
+    assert violated is rule
+    assert 0 < retry_after <= 60
+    assert (await limiter.check("client", [rule], Priority.CRITICAL))[0] is True
+
+def test_reserved_fraction():
+    rule = RateLimitRule(limit="100/minute", reserved={Priority.CRITICAL: 0.1, Priority.HIGH: 0.2})
+    assert rule.reserved_fraction(Priority.CRITICAL) == 0
+    assert rule.reserved_fraction(Priority.HIGH) == pytest.approx(0.1)
+    assert rule.reserved_fraction() == pytest.approx(0.3)
+    assert RateLimitRule(limit="1/second").reserved_fraction(Priority.BACKGROUND) == 0
+
+@pytest.mark.parametrize("reserved", [{Priority.HIGH: 1.5}, {Priority.HIGH: 0.6, Priority.CRITICAL: 0.6}])
+def test_invalid_reservations_are_rejected(reserved):
+    with pytest.raises(ValidationError):
+        RateLimitRule(limit="1/second", reserved=reserved)
+
+class FakeURL:
+    def __init__(self, path):
+        self.path = path
+
+class FakeRequest:
+    def __init__(self, headers=None, path="/"):
+        self.headers = headers or {}
+        self.url = FakeURL(path)
+
+@pytest.mark.asyncio
+async def test_priority_resolvers():
+    header = HeaderPriorityResolver("X-Priority")
+    assert await header.resolve(FakeRequest({"X-Priority": "critical"})) == Priority.CRITICAL
+    assert await header.resolve(FakeRequest({"X-Priority": "unknown"})) == Priority.NORMAL
+
+    path = PathPriorityResolver({"/health": Priority.CRITICAL, "/crawl": Priority.BACKGROUND})
+    assert await path.resolve(FakeRequest(path="/health/live")) == Priority.CRITICAL
+    assert await path.resolve(FakeRequest(path="/crawl/page")) == Priority.BACKGROUND
+    assert await path.resolve(FakeRequest(path="/checkout")) == Priority.NORMAL
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import pytest
+from pydantic import ValidationError
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
+
+@pytest.mark.asyncio
+async def test_shaping_delays_instead_of_rejecting(limiter):
+    rule = RateLimitRule(limit="10/second", mode="shape", max_wait=1.0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limiter.check("svc", [rule]) for _ in range(12)))
+    elapsed = time.perf_counter() - start
+
+    assert all(allowed for allowed, _, _ in results)
+    # 10 requests fit the burst, the 11th and 12th wait for 100ms emission slots
+    assert 0.15 <= elapsed < 1.0
+    assert limiter._queued == 0
+
+@pytest.mark.asyncio
+async def test_request_beyond_max_wait_is_rejected(limiter):
+    rule = RateLimitRule(limit="2/minute", mode="shape", max_wait=1.0)
+
+    assert (await limiter.check("svc", [rule]))[0] is True
+    assert (await limiter.check("svc", [rule]))[0] is True
+    allowed, violated, retry_after = await limiter.check("svc", [rule])
+    assert allowed is False
+    assert violated is rule
+    assert 28 <= retry_after <= 30
+
+@pytest.mark.asyncio
+async def test_full_queue_admits_only_requests_without_wait(limiter):
+    limiter.config.max_queued = 0
+    rule = RateLimitRule(limit="1/second", mode="shape", max_wait=5.0)
+
+    assert (await limiter.check("svc", [rule]))[0] is True
+    allowed, _, retry_after = await limiter.check("svc", [rule])
+    assert allowed is False
+    assert retry_after >= 1
+
+class SlowStorage(MemoryStorage):
+    async def schedule(self, *args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await super().schedule(*args, **kwargs)
+
+@pytest.mark.asyncio
+async def test_requests_without_a_queue_place_reserve_nothing():
+    storage = SlowStorage()
+    limiter = RateLimiter(RateGuardConfig(max_queued=1), storage=storage)
+    rule = RateLimitRule(limit="2/second", mode="shape", max_wait=5.0)
+
+    results = await asyncio.gather(*(limiter.check("svc", [rule]) for _ in range(10)))
+
+    # Only the burst is admitted; the rest could not queue and reserved no slot
+    assert sum(allowed for allowed, _, _ in results) == 2
+    tat = storage._data["rl:svc:2/second"]["tat"]
+    assert tat - storage.clock.time() * 1000 <= 1000
+    assert limiter._queued == 0
+
+@pytest.mark.asyncio
+async def test_gcra_schedule_matches_between_backends(make_redis_storage):
+    clock = VirtualClock(1_000.0)
+    redis = make_redis_storage(clock)
+    memory = MemoryStorage(clock=clock)
+
+    for step in [0, 0, 0, 0.05, 0.01, 0.3, 0, 0, 1.2, 0]:
+        clock.advance(step)
+        kwargs = dict(key="k", limit=5, window=1, max_wait=0.5, capacity=2)
+        assert await redis.schedule(**kwargs) == await memory.schedule(**kwargs)
+
+def test_invalid_mode_is_rejected():
+    with pytest.raises(ValidationError):
+        RateLimitRule(limit="1/second", mode="queue")
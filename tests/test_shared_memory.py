@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import pytest
+from py_rate_guard.core.algorithms import STRATEGIES
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.exceptions import ConfigurationError, StorageError
+from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.storage.shared_memory import SharedMemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
+
+@pytest.fixture
+def table_path(tmp_path):
+    return str(tmp_path / "table")
+
+def hammer(path, count, results):
+    async def run():
+        storage = SharedMemoryStorage(path, slots=256, segments=4)
+        admitted = 0
+        for _ in range(count):
+            allowed, _, _ = await storage.check_and_increment("user", 100, 60, "sliding_window")
+            admitted += allowed
+        await storage.close()
+        return admitted
+    results.put(asyncio.run(run()))
+
+def test_limit_is_exact_across_processes(table_path):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=hammer, args=(table_path, 60, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert sum(results.get(timeout=5) for _ in workers) == 100
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+async def test_strategies_match_memory_storage(table_path, strategy):
+    clock = VirtualClock(1_000.0)
+    shared = SharedMemoryStorage(table_path, slots=64, segments=2, clock=clock)
+    memory = MemoryStorage(clock)
+
+    for step in range(40):
+        key = f"user-{step % 3}"
+        expected = await memory.check_and_increment(key, 5, 10, strategy, capacity=8, precision=5)
+        assert await shared.check_and_increment(key, 5, 10, strategy, capacity=8, precision=5) == expected
+        clock.advance(0.7)
+    await shared.close()
+
+@pytest.mark.asyncio
+async def test_hierarchy_schedule_and_block_match_memory_storage(table_path):
+    clock = VirtualClock(1_000.0)
+    shared = SharedMemoryStorage(table_path, slots=64, segments=4, clock=clock)
+    memory = MemoryStorage(clock)
+    levels = [(3, 60, False), (2, 60, True)]
+
+    for _ in range(5):
+        for storage_call in (
+            lambda s: s.check_hierarchy(["org", "org:user"], levels),
+            lambda s: s.schedule("gcra", 2, 1, max_wait=1.0),
+            lambda s: s.block("vendor", 3),
+            lambda s: s.blocked_for("vendor"),
+        ):
+            assert await storage_call(shared) == await storage_call(memory)
+        clock.advance(0.4)
+    await shared.close()
+
+@pytest.mark.asyncio
+async def test_expired_slots_are_reused_and_a_full_table_denies(table_path, caplog):
+    clock = VirtualClock(0.0)
+    storage = SharedMemoryStorage(table_path, slots=8, segments=1, clock=clock)
+
+    for i in range(8):
+        assert (await storage.check_and_increment(f"k{i}", 1, 1, "fixed_window"))[0]
+    assert await storage.check_and_increment("k8", 1, 1, "fixed_window") == (False, 0, 1)
+    assert "segment 0 is full" in caplog.text
+
+    clock.advance(2)
+    assert (await storage.check_and_increment("k8", 1, 1, "fixed_window"))[0]
+    await storage.close()
+
+@pytest.mark.asyncio
+async def test_layout_mismatch_and_oversized_state(table_path):
+    storage = SharedMemoryStorage(table_path, slots=16, value_size=64, segments=2)
+    with pytest.raises(ConfigurationError):
+        SharedMemoryStorage(table_path, slots=32, value_size=64, segments=2)
+    with pytest.raises(StorageError):
+        await storage.check_and_increment("user", 100, 60, "sliding_window")
+    with pytest.raises(ConfigurationError):
+        SharedMemoryStorage(table_path, value_size=64, rules=[RateLimitRule(limit="100/minute")])
+    with pytest.raises(ConfigurationError):
+        SharedMemoryStorage(table_path + "/missing/table")
+    await storage.close()
+
+@pytest.mark.asyncio
+async def test_large_sliding_window_never_fails_open(table_path, tmp_path):
+    rule = RateLimitRule(limit="200/minute")
+
+    # Declared up front, a rule that does not fit is rejected before any request
+    with pytest.raises(ConfigurationError):
+        SharedMemoryStorage(table_path, slots=64, value_size=1024, rules=[rule])
+
+    # Undeclared, it is a storage failure: the configured policy applies, here fail closed
+    config = RateGuardConfig(fail_open=False, graceful_degradation=False)
+    limiter = RateLimiter(config, storage=SharedMemoryStorage(table_path, slots=64))
+    with pytest.raises(StorageError):
+        await limiter.check("user", [rule])
+    await limiter.close()
+
+    storage = SharedMemoryStorage(str(tmp_path / "sized"), slots=64, rules=[rule])
+    assert storage.value_size >= 8 * 200
+    limiter = RateLimiter(RateGuardConfig(), storage=storage)
+    results = [(await limiter.check("user", [rule]))[0] for _ in range(1000)]
+    assert sum(results) == 200
+    await limiter.close()
+
+@pytest.mark.asyncio
+async def test_near_cache_answers_denials_locally(table_path, counting_storage):
+    backend = counting_storage
+    limiter = RateLimiter(
+        RateGuardConfig(), storage=SharedMemoryStorage(table_path, slots=64, backend=backend)
+    )
+    rule = RateLimitRule(limit="4/minute", strategy="fixed_window", reserved={3: 0.5})
+
+    results = [(await limiter.check("user", [rule]))[0] for _ in range(10)]
+    assert results == [True, True] + [False] * 8
+    # The first denial is cached; the remaining ones never reach the backend
+    assert backend.calls == 3
+
+    # Denials are cached per reserved fraction, so a higher class still gets its reserve
+    assert (await limiter.check("user", [rule], priority=3))[0] is True
+    assert backend.calls == 4
+    await limiter.close()
@@ -0,0 +1,78 @@
+import random
+import pytest
+from py_rate_guard.models.config import RateLimitRule
+from py_rate_guard.simulation.simulator import Simulator, TraceEvent, load_trace, simulate
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
+
+def random_trace(n: int = 300, seed: int = 7):
+    rng = random.Random(seed)
+    now = 1_000_000.0
+    events = []
+    for _ in range(n):
+        now += rng.expovariate(8)
+        events.append(TraceEvent(now, f"k{rng.randint(0, 3)}", rng.choice([1, 1, 1, 3])))
+    return events
+
+# fixed_window is excluded: its expiry is driven by the Redis server clock
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "strategy", ["sliding_window", "token_bucket", "leaky_bucket", "bucketed_window"]
+)
+async def test_simulator_matches_redis_and_memory_storage(strategy, make_redis_storage):
+    rule = RateLimitRule(limit="5/2seconds", capacity=8, precision=4)
+    events = random_trace()
+
+    clock = VirtualClock()
+    redis_storage = make_redis_storage(clock)
+    memory_storage = MemoryStorage(clock=clock)
+    simulator = Simulator(rule, [strategy])
+
+    for event in events:
+        clock.set(event.timestamp)
+        kwargs = dict(increment=event.cost, capacity=rule.capacity, precision=rule.bucket_count)
+        from_redis = await redis_storage.check_and_increment(
+            event.key, rule.requests, rule.window_seconds, strategy, **kwargs
+        )
+        from_memory = await memory_storage.check_and_increment(
+            event.key, rule.requests, rule.window_seconds, strategy, **kwargs
+        )
+        assert from_memory == from_redis
+        assert simulator.feed(event)[strategy] == from_redis[0]
+
+    report = simulator.finish()[strategy]
+    assert 0 < report.admitted < len(events)
+
+def test_simulate_reports_burst_overshoot():
+    events = [TraceEvent(100.0, "user", 1) for _ in range(10)]
+    reports = simulate(events, RateLimitRule(limit="5/second", capacity=10))
+
+    assert reports["sliding_window"].admitted == 5
+    assert reports["sliding_window"].denied == 5
+    assert reports["sliding_window"].burst_overshoot == 0
+    assert reports["token_bucket"].admitted == 10
+    assert reports["token_bucket"].burst_overshoot == 5
+    assert reports["fixed_window"].redis_commands == 3 + 4 * 2 + 5 * 2
+    assert reports["sliding_window"].peak_memory_bytes > reports["fixed_window"].peak_memory_bytes
+
+@pytest.mark.asyncio
+async def test_memory_storage_fixed_window_resets_on_virtual_clock():
+    clock = VirtualClock(50.0)
+    storage = MemoryStorage(clock=clock)
+
+    assert (await storage.check_and_increment("k", 1, 10, "fixed_window"))[0] is True
+    allowed, _, retry_after = await storage.check_and_increment("k", 1, 10, "fixed_window")
+    assert allowed is False
+    assert retry_after == 10
+
+    clock.advance(10.5)
+    assert (await storage.check_and_increment("k", 1, 10, "fixed_window"))[0] is True
+
+def test_load_trace(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("timestamp,key,cost\n1.5,alice,2\n2.0,bob\n")
+
+    assert list(load_trace(str(path))) == [
+        TraceEvent(1.5, "alice", 2),
+        TraceEvent(2.0, "bob", 1),
+    ]
@@ -1,22 +1,15 @@
 import pytest
 import asyncio
 import time
-from fakeredis.aioredis import FakeRedis
-from py_rate_guard.storage.redis import RedisStorage
-from py_rate_guard.models.config import RedisConfig
+from pydantic import ValidationError
+from py_rate_guard.core.algorithms import bucket_layout
+from py_rate_guard.models.config import RateLimitRule
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
 
 @pytest.fixture
-async def redis_storage():
-    config = RedisConfig()
-    storage = RedisStorage(config)
-    # Patch the client with FakeRedis
-    storage.client = FakeRedis(decode_responses=True)
-    # Register scripts manually for FakeRedis
-    from py_rate_guard.utils.lua import SLIDING_WINDOW_SCRIPT, TOKEN_BUCKET_SCRIPT, FIXED_WINDOW_SCRIPT
-    storage._scripts['sliding_window'] = storage.client.register_script(SLIDING_WINDOW_SCRIPT)
-    storage._scripts['token_bucket'] = storage.client.register_script(TOKEN_BUCKET_SCRIPT)
-    storage._scripts['fixed_window'] = storage.client.register_script(FIXED_WINDOW_SCRIPT)
-    return storage
+def redis_storage(make_redis_storage):
+    return make_redis_storage()
 
 @pytest.mark.asyncio
 async def test_fixed_window(redis_storage):
@@ -65,3 +58,87 @@ async def test_sliding_window(redis_storage):
     # Should be allowed again
     allowed, _, _ = await redis_storage.check_and_increment(key, limit, window, "sliding_window")
     assert allowed is True
+
+@pytest.mark.asyncio
+async def test_bucketed_window(redis_storage):
+    key = "test_bucketed"
+    limit = 3
+    window = 1
+    precision = 4  # 250ms buckets
+
+    for expected_remaining in (2, 1, 0):
+        allowed, remaining, _ = await redis_storage.check_and_increment(
+            key, limit, window, "bucketed_window", precision=precision
+        )
+        assert allowed is True
+        assert remaining == expected_remaining
+
+    allowed, _, retry_after = await redis_storage.check_and_increment(
+        key, limit, window, "bucketed_window", precision=precision
+    )
+    assert allowed is False
+    assert retry_after >= 1
+
+    # One hash per key, never more than precision + 1 buckets
+    assert await redis_storage.client.hlen(key) <= precision + 1
+
+    # Every counted bucket has expired after window + one bucket
+    await asyncio.sleep(1.3)
+
+    allowed, remaining, _ = await redis_storage.check_and_increment(
+        key, limit, window, "bucketed_window", precision=precision
+    )
+    assert allowed is True
+    assert remaining == 2
+    assert await redis_storage.client.hlen(key) == 1
+
+@pytest.mark.asyncio
+async def test_bucketed_window_buckets_are_at_least_one_millisecond(make_redis_storage):
+    assert bucket_layout(1, 5000) == (1000, 1)
+    with pytest.raises(ValidationError):
+        RateLimitRule(limit="1/second", precision=5000)
+
+    clock = VirtualClock(1_000.0)
+    for storage in (make_redis_storage(clock), MemoryStorage(clock)):
+        assert (await storage.check_and_increment("sub_ms", 1, 1, "bucketed_window", precision=5000))[0]
+        clock.advance(0.5)
+        assert (await storage.check_and_increment("sub_ms", 1, 1, "bucketed_window", precision=5000))[0] is False
+        # The window still spans one second, not precision milliseconds
+        clock.advance(1.5)
+        assert (await storage.check_and_increment("sub_ms", 1, 1, "bucketed_window", precision=5000))[0]
+
+@pytest.mark.asyncio
+async def test_bucketed_window_weighted_increment(redis_storage):
+    key = "test_bucketed_weighted"
+
+    allowed, remaining, _ = await redis_storage.check_and_increment(
+        key, 10, 60, "bucketed_window", increment=7, precision=60
+    )
+    assert allowed is True
+    assert remaining == 3
+
+    allowed, _, retry_after = await redis_storage.check_and_increment(
+        key, 10, 60, "bucketed_window", increment=4, precision=60
+    )
+    assert allowed is False
+    assert 0 < retry_after <= 61
+
+@pytest.mark.asyncio
+async def test_memory_storage_sweeps_idle_keys():
+    clock = VirtualClock(1_000.0)
+    storage = MemoryStorage(clock, sweep_interval=30)
+    for i in range(100):
+        await storage.check_and_increment(f"idle-{i}", 5, 10, "sliding_window")
+    # Denied before writing anything: leaves an empty state behind
+    await storage.check_and_increment("reserved", 1, 10, "fixed_window", reserve=1.0)
+    assert len(storage._data) == 101
+
+    # Expired but not yet due for a sweep
+    clock.advance(20)
+    await storage.check_and_increment("active", 5, 60, "sliding_window")
+    assert len(storage._data) == 102
+
+    # The sweep evicts every idle key, including ones never accessed again
+    clock.advance(15)
+    await storage.check_and_increment("active", 5, 60, "sliding_window")
+    assert list(storage._data) == ["active"]
@@ -0,0 +1,148 @@
+from contextlib import ExitStack
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from py_rate_guard.adapters.fastapi import FastAPIRateGuard
+from py_rate_guard.core.engine import RateLimiter
+from py_rate_guard.core.lease import LeasePool, TokenLease
+from py_rate_guard.models.config import RateGuardConfig, RateLimitRule
+from py_rate_guard.storage.memory import MemoryStorage
+from py_rate_guard.utils.clock import VirtualClock
+
+def echo_app(storage, **limits):
+    guard = FastAPIRateGuard(RateGuardConfig())
+    guard.limiter.storage = storage
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    @guard.websocket_limit(**limits)
+    async def echo(websocket: WebSocket):
+        await websocket.accept()
+        try:
+            while True:
+                await websocket.send_text(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+
+    return TestClient(app), guard.limiter.storage
+
+def test_connection_attempts_are_limited(counting_storage):
+    client, _ = echo_app(counting_storage, connect_limit="2/minute")
+
+    for _ in range(2):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text("hi")
+            assert ws.receive_text() == "hi"
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws") as ws:
+            ws.receive_text()
+    assert exc_info.value.code == 1008
+
+def test_messages_are_admitted_from_a_leased_budget(counting_storage):
+    client, storage = echo_app(counting_storage, message_limit="25/minute", lease_size=10)
+
+    with client.websocket_connect("/ws") as ws:
+        for i in range(20):
+            ws.send_text(str(i))
+            assert ws.receive_text() == str(i)
+        # Two leases of 10 units
+        assert storage.calls == 2
+
+        # Near the limit, messages are charged one by one
+        for i in range(5):
+            ws.send_text(str(i))
+            assert ws.receive_text() == str(i)
+
+        ws.send_text("over")
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_text()
+    assert exc_info.value.code == 1008
+
+def test_connections_on_one_key_share_a_lease(counting_storage):
+    client, storage = echo_app(counting_storage, message_limit="30/minute")
+
+    with client, ExitStack() as stack:
+        sockets = [stack.enter_context(client.websocket_connect("/ws")) for _ in range(5)]
+        for i, ws in enumerate(sockets):
+            ws.send_text(str(i))
+            assert ws.receive_text() == str(i)
+    # One lease of 10 units serves all five connections
+    assert storage.calls == 1
+
+    # Units left by closed connections go to the key's next connection
+    with client.websocket_connect("/ws") as ws:
+        for i in range(5):
+            ws.send_text(str(i))
+            assert ws.receive_text() == str(i)
+    assert storage.calls == 1
+
+def test_messages_are_weighted_by_frame_size(counting_storage):
+    client, _ = echo_app(counting_storage, message_limit="10/minute", frame_bytes=100, lease_size=1)
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text("x" * 450)  # 5 units
+        assert len(ws.receive_text()) == 450
+        ws.send_text("x" * 401)  # 5 units
+        assert len(ws.receive_text()) == 401
+        ws.send_text("y")
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_text()
+
+@pytest.mark.asyncio
+async def test_lease_expires_and_falls_back_to_exact_cost():
+    clock = VirtualClock(1_000.0)
+    limiter = RateLimiter(RateGuardConfig(), storage=MemoryStorage(clock))
+    rule = RateLimitRule(limit="12/minute")
+    lease = TokenLease(limiter, "conn", rule, lease_size=5, clock=clock.time)
+
+    assert await lease.acquire() == (True, 0)
+    assert lease.tokens == 4
+    # Unused units are dropped once the lease has outlived the window
+    clock.advance(61)
+    assert await lease.acquire() == (True, 0)
+    assert lease.tokens == 4
+    assert await lease.acquire(10) == (True, 0)
+    # Only 1 unit left in the window: a full lease is denied, the exact cost is not
+    assert await lease.acquire() == (True, 0)
+    assert lease.tokens == 0
+    violations = []
+    limiter.rg_logger.log_violation = lambda *args: violations.append(args)
+    allowed, retry_after = await lease.acquire()
+    assert allowed is False and retry_after > 0
+    # The full lease attempt is not a violation, only the exact cost is
+    assert len(violations) == 1
+
+def test_lease_is_sized_from_the_rule_rate():
+    limiter = RateLimiter(RateGuardConfig(), storage=MemoryStorage())
+    rule = RateLimitRule(limit="30/minute")
+
+    assert TokenLease(limiter, "conn", rule).lease_ttl == 60
+    assert TokenLease(limiter, "conn", rule).lease_size == 10
+    # Half a unit per second: a one second lease holds a single unit
+    assert TokenLease(limiter, "conn", rule, lease_ttl=1.0).lease_size == 1
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lease_ttl", [None, 1.0])
+async def test_slow_client_under_the_limit_is_never_refused(lease_ttl):
+    clock = VirtualClock(1_000.0)
+    limiter = RateLimiter(RateGuardConfig(), storage=MemoryStorage(clock))
+    rule = RateLimitRule(limit="30/minute")
+    lease = TokenLease(limiter, "conn", rule, lease_ttl=lease_ttl, clock=clock.time)
+
+    # 20 messages per minute for five minutes
+    for _ in range(100):
+        assert await lease.acquire() == (True, 0)
+        clock.advance(3)
+
+def test_lease_pool_evicts_expired_leases():
+    clock = VirtualClock(1_000.0)
+    limiter = RateLimiter(RateGuardConfig(), storage=MemoryStorage(clock))
+    pool = LeasePool(limiter, RateLimitRule(limit="30/minute"), clock=clock.time)
+
+    assert pool.get("a") is pool.get("a")
+    assert pool.get("a") is not pool.get("b")
+    clock.advance(61)
+    pool.get("c")
+    assert len(pool) == 1